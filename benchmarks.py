@@ -0,0 +1,471 @@
+import argparse
+import ctypes
+from functools import partial
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(tempfile.gettempdir(), "pytext-benchmarks")
+DEFAULT_SIZES = ("1K", "1M", "16M")
+DEFAULT_REPEAT = 3
+REGRESSION_THRESHOLD = 0.1
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+    "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo"
+).split()
+BLOCK_SIZE = 1024 * 1024
+
+
+def parseSize(text: str) -> int:
+    """Return a size such as '1K', '16M' or '500M' in bytes."""
+    text = text.strip().upper().rstrip("B")
+    unit = text[-1:] if text[-1:] in SIZE_UNITS else ""
+    return int(float(text[:len(text) - len(unit)]) * SIZE_UNITS[unit])
+
+
+def formatSize(size: int) -> str:
+    """Return a size in bytes in the shortest unit it divides into."""
+    for unit in ("G", "M", "K"):
+        if size and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+
+    return str(size)
+
+
+def corpusPath(size: int, kind: str = "text") -> str:
+    """Return the path of a generated corpus, creating it on first use.
+
+    Corpora are written to CORPUS_DIR and reused by later runs, so they are
+    generated once rather than inside the timed scenarios.
+
+    Args:
+        size (int): Size of the corpus in bytes.
+        kind (str): "text" for lines of words, "expressions" for one
+            calculator expression per line."""
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    path = os.path.join(CORPUS_DIR, f"{kind}-{size}.txt")
+    if not os.path.exists(path):
+        block = _textBlock if kind == "text" else _expressionBlock
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            written = 0
+            for chunk in block(random.Random(size)):
+                chunk = chunk[:size - written]
+                file.write(chunk)
+                written += len(chunk)
+                if written >= size:
+                    break
+
+        os.replace(temporary, path)
+
+    return path
+
+
+def _textBlock(rng: random.Random) -> str:
+    """Yield blocks of lines of words, ending each block on a newline."""
+    while True:
+        lines = []
+        length = 0
+        while length < BLOCK_SIZE:
+            line = " ".join(rng.choices(WORDS, k=rng.randint(1, 16))) + "\n"
+            lines.append(line)
+            length += len(line)
+
+        yield "".join(lines)
+
+
+def _expressionBlock(rng: random.Random) -> str:
+    """Yield blocks of calculator expressions, one per line."""
+    operators = ("+", "-", "*", "/", "**", "//")
+    while True:
+        lines = []
+        length = 0
+        while length < BLOCK_SIZE:
+            terms = [str(rng.randint(0, 999)) for _ in range(rng.randint(1, 8))]
+            expression = terms[0]
+            for term in terms[1:]:
+                operator = rng.choice(operators)
+                if operator == "**":
+                    term = str(rng.randint(0, 4))
+
+                expression += operator + term
+
+            if rng.random() < 0.3:
+                expression = f"({expression})*{rng.randint(1, 99)}"
+
+            lines.append(expression + "\n")
+            length += len(expression) + 1
+
+        yield "".join(lines)
+
+
+def readCorpus(size: int, kind: str = "text") -> str:
+    """Return the contents of a generated corpus."""
+    with open(corpusPath(size, kind)) as file:
+        return file.read()
+
+
+def application() -> tuple:
+    """Return PyText's view and the application, creating them on first use."""
+    from PyQt5.QtWidgets import QApplication
+    from pytext import PyTextCtrl
+    from pytext import PyTextGui
+    from pytext import PyTextModl
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    view = PyTextGui()
+    view.show()
+    PyTextCtrl(model=PyTextModl(), view=view)
+    app.processEvents()
+    return app, view
+
+
+def waitUntil(app: object, condition: Callable) -> None:
+    """Run the event loop until condition returns True."""
+    from PyQt5.QtCore import QEventLoop
+
+    while not condition():
+        app.processEvents(QEventLoop.AllEvents | QEventLoop.WaitForMoreEvents, 50)
+
+
+def benchWordCount(size: int) -> Callable:
+    """PyTextModl.getWordCount over the whole corpus."""
+    from pytext import PyTextModl
+
+    text = readCorpus(size)
+    model = PyTextModl()
+    return lambda: model.getWordCount(text)
+
+
+def benchOpen(size: int, extension: str = ".txt") -> Callable:
+    """PyTextGui.openPath until the file is fully loaded or indexed.
+
+    The extension picks the editor: ".txt" opens in the plain text editor,
+    others such as ".dat" in the rich one."""
+    from PyQt5.QtCore import QThreadPool
+
+    path = corpusPath(size)
+    if extension != ".txt":
+        link = os.path.splitext(path)[0] + extension
+        if not os.path.exists(link):
+            try:
+                os.symlink(path, link)
+            except OSError:
+                # Windows only lets privileged users create symlinks.
+                shutil.copyfile(path, link)
+
+        path = link
+
+    app, view = application()
+
+    def run() -> None:
+        view.openPath(path)
+        if view.largeFileView is not None:
+            QThreadPool.globalInstance().waitForDone()
+
+        waitUntil(app, lambda: view._loader is None)
+        app.processEvents()
+
+    return run
+
+
+def benchSave(size: int) -> Callable:
+    """PyTextGui.writeFile of a plain text document until it is on disk."""
+    app, view = application()
+    view.centralWidget.setPlainText(readCorpus(size))
+    app.processEvents()
+    path = os.path.join(CORPUS_DIR, f"save-{os.getpid()}.txt")
+
+    def run() -> None:
+        view.writeFile(path, "plain")
+        view._savePool.waitForDone()
+        app.processEvents()
+        os.remove(path)
+
+    return run
+
+
+def benchSetText(size: int) -> Callable:
+    """QTextEdit.setText of the corpus, including the word count update."""
+    app, view = application()
+    text = readCorpus(size)
+
+    def run() -> None:
+        view.centralWidget.setText(text)
+        app.processEvents()
+
+    return run
+
+
+def benchStartup(size: int, fastStart: bool = False) -> Callable:
+    """Building PyText's window until the editor first paints."""
+    from PyQt5.QtWidgets import QApplication
+    from pytext import PyTextCtrl
+    from pytext import PyTextGui
+    from pytext import PyTextModl
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    def run() -> None:
+        view = PyTextGui(fastStart=fastStart)
+        PyTextCtrl(model=PyTextModl(), view=view)
+        view.show()
+        waitUntil(app, lambda: view.firstPaintTime is not None)
+
+    return run
+
+
+def benchQrcImport(size: int) -> Callable:
+    """Importing the compiled qrc_resources module."""
+    def run() -> None:
+        import qrc_resources
+
+    return run
+
+
+def benchEvaluate(size: int) -> Callable:
+    """pycalc.evaluateExpression on a corpus of expressions."""
+    from pycalc import evaluateExpression
+
+    expressions = readCorpus(size, "expressions").splitlines()
+    return lambda: [evaluateExpression(expression) for expression in expressions]
+
+
+SCENARIOS = {
+    "wordCount": (benchWordCount, "text"),
+    "open": (benchOpen, "text"),
+    "openRich": (partial(benchOpen, extension=".dat"), "text"),
+    "save": (benchSave, "text"),
+    "setText": (benchSetText, "text"),
+    "startup": (benchStartup, None),
+    "fastStart": (partial(benchStartup, fastStart=True), None),
+    "qrcImport": (benchQrcImport, None),
+    "evaluate": (benchEvaluate, "expressions"),
+}
+
+
+def peakMemory() -> int:
+    """Return the peak resident set size of this process in bytes.
+
+    Windows has no resource module, so its peak working set is read
+    instead. Elsewhere without either, 0 is returned."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    if sys.platform == "win32":
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                    "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                    "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage"
+                )
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        getProcessMemoryInfo = ctypes.windll.psapi.GetProcessMemoryInfo
+        getProcessMemoryInfo.argtypes = [
+            wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD
+        ]
+        getCurrentProcess = ctypes.windll.kernel32.GetCurrentProcess
+        getCurrentProcess.restype = wintypes.HANDLE
+        if getProcessMemoryInfo(getCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+
+    return 0
+
+
+def measure(scenario: str, size: int) -> dict:
+    """Run one scenario in this process and return its measurements.
+
+    Returns:
+        Measurement (dict): Wall time of the timed section, and the peak
+            memory of the process before and after it."""
+    setup, _ = SCENARIOS[scenario]
+    run = setup(size)
+    setupMemory = peakMemory()
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "setupMemory": setupMemory, "peakMemory": peakMemory()}
+
+
+def runScenario(scenario: str, size: int, repeat: int) -> dict:
+    """Run a scenario in fresh processes and return its best result.
+
+    Each repetition gets its own interpreter, so imports, caches and peak
+    memory are measured from a cold start every time.
+
+    Args:
+        scenario (str): Key of SCENARIOS.
+        size (int): Corpus size in bytes; ignored by scenarios without one.
+        repeat (int): Number of runs; the fastest time and the highest
+            peak memory are reported."""
+    kind = SCENARIOS[scenario][1]
+    if kind is not None:
+        corpusPath(size, kind)
+    else:
+        size = 0
+
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", PYTHONPATH=ROOT_DIR)
+    runs = []
+    for _ in range(repeat):
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run", scenario, str(size)],
+            env=env, cwd=ROOT_DIR, capture_output=True, text=True
+        )
+        if child.returncode:
+            raise RuntimeError(f"{scenario} {formatSize(size)} failed:\n{child.stderr}")
+
+        runs.append(json.loads(child.stdout.splitlines()[-1]))
+
+    seconds = min(run["seconds"] for run in runs)
+    return {
+        "scenario": scenario,
+        "size": size,
+        "seconds": seconds,
+        "throughput": size / seconds if size and seconds else None,
+        "setupMemory": max(run["setupMemory"] for run in runs),
+        "peakMemory": max(run["peakMemory"] for run in runs),
+    }
+
+
+def gitCommit() -> str:
+    """Return the commit the working tree is at, or None outside git."""
+    try:
+        child = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True
+        )
+    except OSError:
+        return None
+
+    return child.stdout.strip() or None
+
+
+def printResults(results: list, file: object = sys.stdout) -> None:
+    """Print a table of results."""
+    print(f"{'scenario':<10} {'size':>6} {'seconds':>10} {'MB/s':>10} {'peak MB':>9}", file=file)
+    for result in results:
+        throughput = result["throughput"]
+        print(
+            f"{result['scenario']:<10} {formatSize(result['size']):>6} "
+            f"{result['seconds']:>10.4f} "
+            f"{throughput / 2 ** 20 if throughput else 0:>10.1f} "
+            f"{result['peakMemory'] / 2 ** 20:>9.1f}",
+            file=file
+        )
+
+
+def compareResults(baseline: dict, results: list, threshold: float) -> int:
+    """Print how results changed from a baseline report.
+
+    Returns:
+        Regressions (int): Number of results slower or larger than the
+            baseline by more than threshold."""
+    previous = {(result["scenario"], result["size"]): result for result in baseline["results"]}
+    regressions = 0
+    print(f"\ncompared with {baseline.get('commit') or 'baseline'}:")
+    print(f"{'scenario':<10} {'size':>6} {'time':>8} {'memory':>8}")
+    for result in results:
+        old = previous.get((result["scenario"], result["size"]))
+        if old is None:
+            continue
+
+        timeRatio = result["seconds"] / old["seconds"] if old["seconds"] else 1.0
+        memoryRatio = result["peakMemory"] / old["peakMemory"] if old["peakMemory"] else 1.0
+        regressed = timeRatio > 1 + threshold or memoryRatio > 1 + threshold
+        regressions += regressed
+        print(
+            f"{result['scenario']:<10} {formatSize(result['size']):>6} "
+            f"{timeRatio:>7.2f}x {memoryRatio:>7.2f}x"
+            f"{'  REGRESSED' if regressed else ''}"
+        )
+
+    return regressions
+
+
+def parseArgs(argv: list) -> argparse.Namespace:
+    """Return the benchmark runner's command line options."""
+    parser = argparse.ArgumentParser(
+        prog="benchmarks", description="Benchmark PyText and PyCalc hot paths"
+    )
+    parser.add_argument(
+        "scenarios", nargs="*", metavar="SCENARIO",
+        help=f"scenarios to run, from {', '.join(SCENARIOS)} (default: all)"
+    )
+    parser.add_argument(
+        "--sizes", default=",".join(DEFAULT_SIZES),
+        help="comma separated corpus sizes such as 1K,1M,500M"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=DEFAULT_REPEAT,
+        help="runs of each scenario; the fastest is reported"
+    )
+    parser.add_argument("--output", metavar="FILE", help="write the results to FILE as JSON")
+    parser.add_argument(
+        "--compare", metavar="FILE",
+        help="compare with results written by an earlier --output"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=REGRESSION_THRESHOLD,
+        help="fraction slower or larger that counts as a regression"
+    )
+    parser.add_argument("--run", nargs=2, metavar=("SCENARIO", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    unknown = [scenario for scenario in args.scenarios if scenario not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario {unknown[0]}")
+
+    return args
+
+
+def main() -> None:
+    """Run the requested scenarios and report, or compare, the results."""
+    args = parseArgs(sys.argv[1:])
+    if args.run:
+        scenario, size = args.run
+        print(json.dumps(measure(scenario, int(size))))
+        return
+
+    sizes = [parseSize(size) for size in args.sizes.split(",")]
+    results = []
+    for scenario in args.scenarios or SCENARIOS:
+        scenarioSizes = sizes if SCENARIOS[scenario][1] is not None else [0]
+        for size in scenarioSizes:
+            results.append(runScenario(scenario, size, args.repeat))
+
+    printResults(results)
+    report = {"commit": gitCommit(), "python": sys.version.split()[0], "results": results}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+        if compareResults(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
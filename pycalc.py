@@ -1,29 +1,61 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+from decimal import Decimal
+from decimal import localcontext
+from fractions import Fraction
+from functools import lru_cache
 from functools import partial
+from itertools import islice
+import math
+import multiprocessing
+import operator
+import os
+import re
 import sys
+import threading
 from typing import Callable
+from typing import Iterable
+from typing import Iterator
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtCore import QObject
+from PyQt5.QtCore import QRunnable
 from PyQt5.QtCore import Qt
+from PyQt5.QtCore import QThreadPool
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QKeySequence
 from PyQt5.QtWidgets import QGridLayout
+from PyQt5.QtWidgets import QLabel
 from PyQt5.QtWidgets import QLineEdit
 from PyQt5.QtWidgets import QPushButton
+from PyQt5.QtWidgets import QShortcut
 from PyQt5.QtWidgets import QVBoxLayout
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtWidgets import QMainWindow
 from PyQt5.QtWidgets import QWidget
 
+from pywatchdog import PyWatchdog
+
 class PyCalcGui(QMainWindow):
     """Pycalc's View (GUI)"""
     def __init__(self: QMainWindow) -> None:
         """Initialise the main view of the GUI with all properties set."""
         super().__init__()
         self.setWindowTitle('PyCalc')
-        self.setFixedSize(235, 235)
+        self.setFixedSize(235, 260)
         self.generalLayout = QVBoxLayout()
         self._centralWidget = QWidget(self)
         self.setCentralWidget(self._centralWidget)
         self._centralWidget.setLayout(self.generalLayout)
         self._createDisplay()
         self._createButtons()
+        self._createShortcuts()
     
 
     def _createDisplay(self: QMainWindow) -> None:
@@ -32,7 +64,13 @@ class PyCalcGui(QMainWindow):
         self.display.setFixedHeight(35)
         self.display.setAlignment(Qt.AlignRight)
         self.display.setReadOnly(True)
+        self.display.setFocus()
         self.generalLayout.addWidget(self.display)
+        self.previewLabel = QLabel()
+        self.previewLabel.setFixedHeight(15)
+        self.previewLabel.setAlignment(Qt.AlignRight)
+        self.previewLabel.setStyleSheet('color: gray')
+        self.generalLayout.addWidget(self.previewLabel)
 
     
     def _createButtons(self: QMainWindow) -> None:
@@ -64,18 +102,30 @@ class PyCalcGui(QMainWindow):
         for btnText, pos in buttons.items():
             self.buttons[btnText] = QPushButton(btnText)
             self.buttons[btnText].setFixedSize(40, 40)
+            self.buttons[btnText].setFocusPolicy(Qt.NoFocus)
             buttonsLayout.addWidget(self.buttons[btnText], pos[0], pos[1])
         
         self.generalLayout.addLayout(buttonsLayout)
 
 
+    def _createShortcuts(self: QMainWindow) -> None:
+        """Create keyboard shortcuts for editing the expression."""
+        self.shortcuts = {
+            'Backspace': QShortcut(QKeySequence(Qt.Key_Backspace), self),
+            'Undo': QShortcut(QKeySequence(QKeySequence.Undo), self),
+            'Previous': QShortcut(QKeySequence(Qt.Key_Up), self),
+            'Next': QShortcut(QKeySequence(Qt.Key_Down), self),
+            'PreviousResult': QShortcut(QKeySequence(Qt.SHIFT + Qt.Key_Up), self),
+            'NextResult': QShortcut(QKeySequence(Qt.SHIFT + Qt.Key_Down), self),
+        }
+
+
     def setDisplayText(self: QMainWindow, text: str) -> None:
         """set display's text.
         
         Args:
             text (str): String of text to be added to the display."""
         self.display.setText(text)
-        self.display.setFocus()
     
 
     def displayText(self: QMainWindow) -> str:
@@ -86,30 +136,142 @@ class PyCalcGui(QMainWindow):
     def clearDisplay(self: QMainWindow) -> None:
         """Clear the display."""
         self.setDisplayText('')
+        self.setPreviewText('')
+    
+
+    def setPreviewText(self: QMainWindow, text: str) -> None:
+        """Set the running result shown under the display.
+        
+        Args:
+            text (str): Preview of the result, or '' to hide it."""
+        self.previewLabel.setText(text)
 
 
 class PyCalcCtrl:
     """PyCalc Controller class."""
-    def __init__(self: object, model: Callable, view: QMainWindow) -> None:
+    def __init__(
+        self: object, model: Callable, view: QMainWindow, preview: object = None,
+        history: object = None
+    ) -> None:
         """Controller initializer."""
         self._evaluate = model
         self._view = view
+        self._preview = preview or PyCalcPreview()
+        self._history = history or PyCalcHistory()
+        self._expression = PyCalcExpression()
+        self._recalled = None
+        self._pendingJob = None
+        self._renderPending = False
         # Connect signals and slots
         self._connectSignals()
     
 
     def _calculateResult(self: object) -> None:
-        """Evaluate the expression."""
-        result = self._evaluate(expression=self._view.displayText())
-        self._view.setDisplayText(result)
+        """Evaluate the expression on a worker thread.
+
+        Expressions already in the history are answered from it."""
+        self._recalled = None
+        expression = self._expression.text()
+        result = self._history.lookup(expression)
+        if result is not None:
+            self._pendingJob = None
+            self._setExpression(result)
+            return
+
+        job = PyCalcJob(self._evaluate, expression)
+        job.signals.finished.connect(partial(self._showResult, job))
+        self._pendingJob = job
+        QThreadPool.globalInstance().start(job)
+
+    def _showResult(self: object, job: QRunnable, result: str) -> None:
+        """Display a result unless the expression has changed since."""
+        if job is self._pendingJob:
+            self._pendingJob = None
+            self._history.record(job.expression, result)
+            self._setExpression(result)
+
+    def _setExpression(self: object, text: str) -> None:
+        """Replace the expression, such as with a result."""
+        self._expression.replace(text)
+        self._preview.reset(text)
+        self._scheduleRender()
+
+    def _clear(self: object) -> None:
+        """Drop any pending result and clear the expression."""
+        self._pendingJob = None
+        self._recalled = None
+        self._setExpression('')
 
     def _buildExpression(self: object, sub_exp: str)-> None:
         """Build expression."""
-        if self._view.displayText() == ERROR_MSG:
-            self._view.clearDisplay()
-        
-        expression = self._view.displayText() + sub_exp
-        self._view.setDisplayText(expression)
+        self._pendingJob = None
+        self._recalled = None
+        if self._expression.text() in {ERROR_MSG, TOO_EXPENSIVE_MSG}:
+            self._expression.replace('')
+            self._preview.reset()
+
+        self._expression.append(sub_exp)
+        self._preview.push(sub_exp)
+        self._scheduleRender()
+
+    def _backspace(self: object) -> None:
+        """Remove the last token entered, or an error message whole."""
+        if self._expression.text() in {ERROR_MSG, TOO_EXPENSIVE_MSG}:
+            self._clear()
+        else:
+            self._edit(self._expression.backspace)
+
+    def _undo(self: object) -> None:
+        """Undo the last change to the expression."""
+        self._edit(self._expression.undo)
+
+    def _edit(self: object, change: Callable) -> None:
+        """Apply a change that removes tokens and restart the preview."""
+        self._pendingJob = None
+        self._recalled = None
+        if change():
+            self._preview.reset(self._expression.text())
+            self._scheduleRender()
+
+    def _recall(self: object, step: int, result: bool = False) -> None:
+        """Show an earlier expression, or its result, from the history.
+
+        Args:
+            step (int): -1 for the previous entry, 1 for the next.
+            result (bool): Show the entry's result rather than its
+                expression."""
+        entries = self._history.entries
+        position = len(entries) if self._recalled is None else self._recalled
+        position += step
+        if not 0 <= position <= len(entries):
+            return
+
+        self._pendingJob = None
+        if position == len(entries):
+            self._recalled = None
+            self._setExpression('')
+        else:
+            self._recalled = position
+            self._setExpression(entries[position][2 if result else 1])
+
+    def _scheduleRender(self: object) -> None:
+        """Render once control returns to the event loop.
+
+        Presses arriving before then are drawn together."""
+        if not self._renderPending:
+            self._renderPending = True
+            QTimer.singleShot(0, self._render)
+
+    def _render(self: object) -> None:
+        """Show the expression and its running result."""
+        self._renderPending = False
+        text = self._expression.text()
+        self._view.setDisplayText(text)
+        preview = self._preview.preview()
+        if preview == text:
+            preview = ''
+
+        self._view.setPreviewText(preview)
 
     def _connectSignals(self: object) -> None:
         """Connect signals and slots."""
@@ -119,39 +281,878 @@ class PyCalcCtrl:
 
         self._view.buttons['='].clicked.connect(self._calculateResult)
         self._view.display.returnPressed.connect(self._calculateResult)
-        self._view.buttons['C'].clicked.connect(self._view.clearDisplay)
+        self._view.buttons['C'].clicked.connect(self._clear)
+        self._view.shortcuts['Backspace'].activated.connect(self._backspace)
+        self._view.shortcuts['Undo'].activated.connect(self._undo)
+        self._view.shortcuts['Previous'].activated.connect(partial(self._recall, -1))
+        self._view.shortcuts['Next'].activated.connect(partial(self._recall, 1))
+        self._view.shortcuts['PreviousResult'].activated.connect(partial(self._recall, -1, True))
+        self._view.shortcuts['NextResult'].activated.connect(partial(self._recall, 1, True))
+
+
+class PyCalcJobSignals(QObject):
+    """Signals emitted by a PyCalcJob."""
+    finished = pyqtSignal(str)
+
+
+class PyCalcJob(QRunnable):
+    """Runs one evaluation off the GUI thread."""
+    def __init__(self: QRunnable, evaluate: Callable, expression: str) -> None:
+        """Initialise the job.
+
+        Args:
+            evaluate (Callable): Model to evaluate the expression with.
+            expression (str): Expression to evaluate."""
+        super().__init__()
+        self.signals = PyCalcJobSignals()
+        self._evaluate = evaluate
+        self.expression = expression
+
+    def run(self: QRunnable) -> None:
+        """Evaluate the expression and emit the result."""
+        self.signals.finished.emit(self._evaluate(expression=self.expression))
+
+
+class PyCalcWorker:
+    """Model evaluating expressions in a separate process within a budget."""
+    def __init__(
+        self: object, model: Callable = None, timeout: float = None,
+        memoryLimit: int = None
+    ) -> None:
+        """Initialise the worker; the process is started on first use.
+
+        Args:
+            model (Callable): Function evaluating a single expression.
+            timeout (float): Seconds an evaluation may take.
+            memoryLimit (int): Bytes the worker may allocate beyond its
+                size at startup. Only enforced where the resource module
+                is available."""
+        self.model = model or evaluateExpression
+        self.timeout = EVALUATION_TIMEOUT if timeout is None else timeout
+        self.memoryLimit = EVALUATION_MEMORY_LIMIT if memoryLimit is None else memoryLimit
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def __call__(self: object, expression: str) -> str:
+        """Return the result of an expression, or TOO_EXPENSIVE_MSG.
+
+        An evaluation that runs out of time or memory takes the worker
+        process down with it; a new one is started for the next call.
+
+        Args:
+            expression (str): Expression to evaluate."""
+        with self._lock:
+            try:
+                if self._process is None or not self._process.is_alive():
+                    self._start()
+
+                self._connection.send(expression)
+                if self._connection.poll(self.timeout):
+                    return self._connection.recv()
+
+            except (EOFError, OSError):
+                pass
+
+            self.close()
+            return TOO_EXPENSIVE_MSG
+
+    def _start(self: object) -> None:
+        """Start a worker process and wait until it is ready."""
+        self._connection, child = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_serveExpressions, args=(child, self.model, self.memoryLimit),
+            daemon=True
+        )
+        self._process.start()
+        child.close()
+        self._connection.recv()
+
+    def close(self: object) -> None:
+        """Stop the worker process."""
+        if self._process is not None:
+            self._process.kill()
+            self._process.join()
+            self._connection.close()
+            self._process = None
+
+
+def _serveExpressions(connection: object, model: Callable, memoryLimit: int) -> None:
+    """Evaluate expressions received over connection until it closes."""
+    _limitMemory(memoryLimit)
+    connection.send(None)
+    while True:
+        try:
+            expression = connection.recv()
+        except EOFError:
+            return
+
+        connection.send(model(expression))
+
+
+def _limitMemory(limit: int) -> None:
+    """Cap this process's address space at its current size plus limit."""
+    if resource is None:
+        return
+
+    try:
+        with open('/proc/self/statm') as statm:
+            size = int(statm.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    soft = size + limit
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+
+    resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
 
 
 ERROR_MSG = "ERROR"
+TOO_EXPENSIVE_MSG = "TOO EXPENSIVE"
+EVALUATION_TIMEOUT = 2.0
+EVALUATION_MEMORY_LIMIT = 512 * 1024 * 1024
+MAX_POWER_BITS = 4 * 10 ** 6
+PREVIEW_MAX_BITS = 10 ** 5
+COMPILE_CACHE_SIZE = 1024
+BATCH_CHUNK_SIZE = 256
+DEFAULT_PRECISION = 28
+MAX_RESULT_DIGITS = 1000
+SCIENTIFIC_DIGITS = 10
+HISTORY_FILE = os.environ.get(
+    'PYCALC_HISTORY', os.path.join(os.path.expanduser('~'), '.pycalc_history')
+)
+NUMBER_REGEX = re.compile(r'(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\Z')
+TOKEN_REGEX = re.compile(
+    r'\s*(?:((?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)|(\*\*|//|[-+*/()]))'
+)
+
+
+class ExpressionError(ValueError):
+    """Raised when an expression is not valid calculator input."""
+
+
+class ExpressionTooExpensive(ArithmeticError):
+    """Raised when a result would be too large to calculate quickly."""
+
+
+def _power(base: object, exponent: object, maxBits: int = MAX_POWER_BITS) -> object:
+    """Return base ** exponent, refusing exact results over maxBits."""
+    integral = exponent
+    if isinstance(exponent, Fraction) and exponent.denominator == 1:
+        integral = exponent.numerator
+
+    if isinstance(integral, int) and isinstance(base, (int, Fraction)):
+        bits = max(abs(base.numerator).bit_length(), base.denominator.bit_length())
+        if bits > 1 and (bits - 1) * abs(integral) > maxBits:
+            raise ExpressionTooExpensive("Result too large")
+
+    return base ** exponent
+
+
+BINARY_OPERATORS = {
+    '+': (1, operator.add),
+    '-': (1, operator.sub),
+    '*': (2, operator.mul),
+    '/': (2, operator.truediv),
+    '//': (2, operator.floordiv),
+    '**': (4, _power),
+}
+UNARY_OPERATORS = {
+    '+': ('pos', operator.pos),
+    '-': ('neg', operator.neg),
+}
+UNARY_FUNCTIONS = {name: function for name, function in UNARY_OPERATORS.values()}
+UNARY_PRECEDENCE = 3
+RIGHT_ASSOCIATIVE = {'**'}
+
+
+def tokenize(expression: str) -> list:
+    """Split an expression into number and operator tokens.
+
+    Args:
+        expression (str): Expression to split.
+
+    Returns:
+        Tokens (list): (number, operator) pairs with one of the two empty."""
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN_REGEX.match(expression, position)
+        if match is None:
+            raise ExpressionError(f"Unexpected character at {position}")
+
+        tokens.append((match.group(1) or '', match.group(2) or ''))
+        position = match.end()
+
+    return tokens
+
+
+class PyCalcParser:
+    """Shunting-yard parser fed one token at a time.
+
+    Follows Python's precedence: unary signs bind tighter than * and / but
+    looser than **, which is right associative. Postfix items are passed to
+    emit as soon as their place is known, so a caller can either collect a
+    program or reduce values as the expression is typed."""
+    def __init__(self: object, emit: Callable) -> None:
+        """Initialise the parser.
+
+        Args:
+            emit (Callable): Called with each (number, operator) pair of the
+                postfix program, in evaluation order."""
+        self._emit = emit
+        self.operators = []
+        self.expectOperand = True
+
+    def copy(self: object, emit: Callable) -> object:
+        """Return a parser in the same state that emits to another callable."""
+        parser = PyCalcParser(emit)
+        parser.operators = list(self.operators)
+        parser.expectOperand = self.expectOperand
+        return parser
+
+    def feed(self: object, number: str, symbol: str) -> None:
+        """Add a (number, operator) token as produced by tokenize.
+
+        Raises:
+            ExpressionError: If the token cannot follow the tokens so far."""
+        operators = self.operators
+        if number:
+            if not self.expectOperand:
+                raise ExpressionError("Missing operator")
+
+            self._emit((number, ''))
+            self.expectOperand = False
+        elif symbol == '(':
+            if not self.expectOperand:
+                raise ExpressionError("Missing operator")
+
+            operators.append(symbol)
+        elif symbol == ')':
+            if self.expectOperand:
+                raise ExpressionError("Missing operand")
+
+            while operators and operators[-1] != '(':
+                self._emit(('', operators.pop()))
+
+            if not operators:
+                raise ExpressionError("Unbalanced parentheses")
+
+            operators.pop()
+        elif self.expectOperand:
+            if symbol not in UNARY_OPERATORS:
+                raise ExpressionError("Missing operand")
+
+            operators.append(UNARY_OPERATORS[symbol][0])
+        elif symbol in BINARY_OPERATORS:
+            precedence = BINARY_OPERATORS[symbol][0]
+            while operators and operators[-1] != '(':
+                topPrecedence = _precedence(operators[-1])
+                if topPrecedence < precedence or (
+                    topPrecedence == precedence and symbol in RIGHT_ASSOCIATIVE
+                ):
+                    break
+
+                self._emit(('', operators.pop()))
+
+            operators.append(symbol)
+            self.expectOperand = True
+        else:
+            raise ExpressionError(f"Unknown operator {symbol}")
+
+    def finish(self: object, closeParentheses: bool = False) -> None:
+        """Emit the operators still waiting on the stack.
+
+        Args:
+            closeParentheses (bool): Treat open parentheses as closed
+                instead of raising an error.
+
+        Raises:
+            ExpressionError: If the expression so far is incomplete."""
+        if self.expectOperand:
+            raise ExpressionError("Missing operand")
+
+        while self.operators:
+            symbol = self.operators.pop()
+            if symbol == '(':
+                if closeParentheses:
+                    continue
+
+                raise ExpressionError("Unbalanced parentheses")
+
+            self._emit(('', symbol))
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compileExpression(expression: str) -> tuple:
+    """Return an expression compiled to a postfix program.
+
+    Compiled programs are cached, so compiling an expression seen recently
+    is a dictionary lookup.
+
+    Args:
+        expression (str): Expression to compile.
+
+    Returns:
+        Program (tuple): (number, operator) pairs in evaluation order. Numbers
+            are kept as literals so one program serves every backend."""
+    program = []
+    parser = PyCalcParser(program.append)
+    for number, symbol in tokenize(expression):
+        parser.feed(number, symbol)
+
+    parser.finish()
+    return tuple(program)
+
+
+def _precedence(symbol: str) -> int:
+    """Return the precedence of an operator on the shunting-yard stack."""
+    if symbol in BINARY_OPERATORS:
+        return BINARY_OPERATORS[symbol][0]
+
+    return UNARY_PRECEDENCE
+
+
+def _floatNumber(literal: str) -> object:
+    """Return a literal as an int, or a float if it has a point or exponent."""
+    if '.' in literal or 'e' in literal or 'E' in literal:
+        return float(literal)
+
+    return int(literal)
+
+
+NUMERIC_BACKENDS = {
+    'float': _floatNumber,
+    'decimal': Decimal,
+    'fraction': Fraction,
+}
 
-def evaluateExpression(expression: str) -> str:
+
+def runProgram(program: tuple, makeNumber: Callable = _floatNumber) -> object:
+    """Return the value of a program produced by compileExpression.
+
+    Args:
+        program (tuple): Compiled postfix program.
+        makeNumber (Callable): Converts a number literal to the backend's type.
+
+    Returns:
+        Value (object): The result of running the program."""
+    stack = []
+    for item in program:
+        _applyItem(stack, item, makeNumber)
+
+    return stack[0]
+
+
+def _applyItem(
+    stack: list, item: tuple, makeNumber: Callable, maxPowerBits: int = MAX_POWER_BITS
+) -> None:
+    """Push a number onto stack or apply an operator to its top values."""
+    number, symbol = item
+    if number:
+        stack.append(makeNumber(number))
+    elif symbol in UNARY_FUNCTIONS:
+        stack[-1] = UNARY_FUNCTIONS[symbol](stack[-1])
+    elif symbol == '**':
+        right = stack.pop()
+        stack[-1] = _power(stack[-1], right, maxPowerBits)
+    else:
+        right = stack.pop()
+        stack[-1] = BINARY_OPERATORS[symbol][1](stack[-1], right)
+
+
+def formatResult(value: object) -> str:
+    """Return a result as display text in time linear in its size.
+
+    Converting a huge integer to decimal is quadratic, so integers and
+    fractions longer than MAX_RESULT_DIGITS are shown in scientific notation
+    worked out from logarithms instead.
+
+    Args:
+        value (object): Result from runProgram.
+
+    Returns:
+        Text (str): The result as text."""
+    if isinstance(value, int):
+        if _digits(value) > MAX_RESULT_DIGITS:
+            return _scientific(value, 1)
+
+    elif isinstance(value, Fraction):
+        if max(_digits(value.numerator), _digits(value.denominator)) > MAX_RESULT_DIGITS:
+            return _scientific(value.numerator, value.denominator)
+
+    return str(value)
+
+
+def _digits(value: int) -> int:
+    """Return an upper bound on the number of decimal digits in an integer."""
+    return int(abs(value).bit_length() * math.log10(2)) + 1
+
+
+def _scientific(numerator: int, denominator: int) -> str:
+    """Return numerator / denominator in scientific notation."""
+    if numerator == 0:
+        return '0'
+
+    sign = '-' if (numerator < 0) != (denominator < 0) else ''
+    logarithm = math.log10(abs(numerator)) - math.log10(abs(denominator))
+    exponent = math.floor(logarithm)
+    mantissa = round(10 ** (logarithm - exponent), SCIENTIFIC_DIGITS - 1)
+    if mantissa >= 10:
+        mantissa /= 10
+        exponent += 1
+
+    return f"{sign}{mantissa:.{SCIENTIFIC_DIGITS - 1}f}e{exponent:+d}"
+
+
+def evaluateExpression(
+    expression: str, backend: str = 'float', precision: int = DEFAULT_PRECISION
+) -> str:
     """Return a string of the evaluated expression.
     
     The functions serves as the model in the MVC architecture.
     
     Args:
         expression (str): Expression to be evaluated from PyCalc view
+        backend (str): Number type to calculate with, a key of
+            NUMERIC_BACKENDS. 'float' follows Python, keeping integers exact.
+        precision (int): Significant digits for the 'decimal' backend.
     
     Returns:
         Result (str): The result of evaluating the expression."""
     try:
-        result = str(eval(expression, {}, {}))
+        with localcontext() as context:
+            context.prec = precision
+            value = runProgram(compileExpression(expression), NUMERIC_BACKENDS[backend])
+            result = formatResult(value)
     
+    except (ExpressionTooExpensive, MemoryError):
+        result = TOO_EXPENSIVE_MSG
+
     except Exception:
         result = ERROR_MSG
     
     return result
 
 
+class PyCalcExpression:
+    """Expression being entered, kept as a list of tokens.
+
+    Tokens are appended in O(1) and joined only when the expression is
+    read, so the display does not have to hold the canonical copy. Every
+    change is recorded so it can be undone."""
+    def __init__(self: object) -> None:
+        """Initialise an empty expression."""
+        self._tokens = []
+        self._undo = []
+        self._text = ''
+
+    def text(self: object) -> str:
+        """Return the expression as a string."""
+        if self._text is None:
+            self._text = ''.join(self._tokens)
+
+        return self._text
+
+    def append(self: object, token: str) -> None:
+        """Add a token to the end of the expression."""
+        self._tokens.append(token)
+        self._undo.append(('append', token))
+        self._text = None
+
+    def backspace(self: object) -> bool:
+        """Remove the last token, returning False if there was none."""
+        if not self._tokens:
+            return False
+
+        self._undo.append(('backspace', self._tokens.pop()))
+        self._text = None
+        return True
+
+    def replace(self: object, text: str) -> None:
+        """Replace the whole expression with text, such as a result.
+
+        The text is split into single character tokens, as if it had been
+        typed, so backspace removes only its last character."""
+        self._undo.append(('replace', self._tokens))
+        self._tokens = list(text)
+        self._text = text
+
+    def undo(self: object) -> bool:
+        """Revert the last change, returning False if there was none."""
+        if not self._undo:
+            return False
+
+        change, value = self._undo.pop()
+        if change == 'append':
+            self._tokens.pop()
+        elif change == 'backspace':
+            self._tokens.append(value)
+        else:
+            self._tokens = value
+
+        self._text = None
+        return True
+
+
+class PyCalcPreview:
+    """Incremental evaluator giving the value of an expression as it is typed.
+
+    Characters are fed through a PyCalcParser whose output is reduced into a
+    stack of values straight away, so each keypress costs amortised O(1) and
+    a preview only has to close off the operators still on the stack."""
+    def __init__(
+        self: object, backend: str = 'float', precision: int = DEFAULT_PRECISION
+    ) -> None:
+        """Initialise an empty preview.
+
+        Args:
+            backend (str): Number type to calculate with, a key of
+                NUMERIC_BACKENDS.
+            precision (int): Significant digits for the 'decimal' backend."""
+        self._makeNumber = NUMERIC_BACKENDS[backend]
+        self._precision = precision
+        self.reset()
+
+    def reset(self: object, text: str = '') -> None:
+        """Start again from text, such as a result left on the display."""
+        self._values = []
+        self._parser = PyCalcParser(self._emitter(self._values))
+        self._literal = ''
+        self._pendingSymbol = ''
+        self._error = False
+        self.push(text)
+
+    def push(self: object, text: str) -> None:
+        """Add typed characters to the end of the expression."""
+        if self._error:
+            return
+
+        try:
+            with localcontext() as context:
+                context.prec = self._precision
+                for char in text:
+                    self._pushChar(char)
+
+        except Exception:
+            self._error = True
+
+    def preview(self: object) -> str:
+        """Return the value of the expression typed so far, or '' if it has none.
+
+        A trailing operator is ignored and open parentheses are closed."""
+        if self._error:
+            return ''
+
+        values = []
+        values.extend(self._values)
+        parser = self._parser.copy(self._emitter(values))
+        try:
+            with localcontext() as context:
+                context.prec = self._precision
+                if self._literal:
+                    self._feedLiteral(parser, self._literal)
+
+                while parser.expectOperand and parser.operators:
+                    if parser.operators.pop() in BINARY_OPERATORS:
+                        parser.expectOperand = False
+
+                if parser.expectOperand:
+                    return ''
+
+                parser.finish(closeParentheses=True)
+                return formatResult(values[0])
+
+        except Exception:
+            return ''
+
+    def _emitter(self: object, values: list) -> Callable:
+        """Return a callable reducing postfix items into values."""
+        return partial(
+            _applyItem, values, makeNumber=self._makeNumber, maxPowerBits=PREVIEW_MAX_BITS
+        )
+
+    def _pushChar(self: object, char: str) -> None:
+        """Add one character, holding back tokens that may still grow."""
+        literal = self._literal
+        if char in '0123456789.' or (literal and (
+            char in 'eE' or (char in '+-' and literal[-1] in 'eE')
+        )):
+            if self._pendingSymbol:
+                self._parser.feed('', self._pendingSymbol)
+                self._pendingSymbol = ''
+
+            self._literal += char
+            return
+
+        if literal:
+            self._feedLiteral(self._parser, literal)
+            self._literal = ''
+
+        if self._pendingSymbol == char:
+            self._parser.feed('', char * 2)
+            self._pendingSymbol = ''
+            return
+
+        if self._pendingSymbol:
+            self._parser.feed('', self._pendingSymbol)
+            self._pendingSymbol = ''
+
+        if char in '*/':
+            self._pendingSymbol = char
+        elif not char.isspace():
+            self._parser.feed('', char)
+
+    def _feedLiteral(self: object, parser: PyCalcParser, literal: str) -> None:
+        """Feed a complete number literal to parser."""
+        if not NUMBER_REGEX.match(literal):
+            raise ExpressionError(f"Invalid number {literal}")
+
+        parser.feed(literal, '')
+
+
+class PyCalcHistory:
+    """Log of calculations with an index for looking results up again.
+
+    Entries are appended to a tab separated file of backend, expression and
+    result, one per line, and read back into memory when the history is
+    opened. Only results the calculator actually produced are kept, so
+    errors and expressions cut short by the budget are evaluated again."""
+    def __init__(
+        self: object, path: str = None, backend: str = 'float',
+        precision: int = DEFAULT_PRECISION
+    ) -> None:
+        """Open the history, reading any entries already logged.
+
+        Args:
+            path (str): File to log calculations to. None keeps the history
+                in memory only.
+            backend (str): Number type results are calculated with.
+            precision (int): Significant digits for the 'decimal' backend."""
+        self.path = path
+        self.key = f"{backend}:{precision}" if backend == 'decimal' else backend
+        self.entries = []
+        self._index = {}
+        self._file = None
+        if path:
+            for entry in readHistory(path):
+                self._add(*entry)
+
+    def lookup(self: object, expression: str) -> str:
+        """Return the logged result of an expression, or None."""
+        return self._index.get((self.key, expression))
+
+    def record(self: object, expression: str, result: str) -> None:
+        """Log the result of an expression."""
+        if not expression or result in {ERROR_MSG, TOO_EXPENSIVE_MSG}:
+            return
+
+        entry = (self.key, expression, result)
+        if any(char in field for field in entry for char in '\t\n'):
+            return
+
+        self._add(*entry)
+        if self.path:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'a')
+
+                self._file.write('\t'.join(entry) + '\n')
+                self._file.flush()
+            except OSError:
+                self.path = None
+
+    def close(self: object) -> None:
+        """Close the log file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _add(self: object, key: str, expression: str, result: str) -> None:
+        """Add an entry to the in-memory history and index."""
+        self.entries.append((key, expression, result))
+        self._index[(key, expression)] = result
+
+
+def readHistory(path: str) -> Iterator:
+    """Yield (backend, expression, result) entries from a history file.
+
+    A missing file has no entries and malformed lines are skipped."""
+    try:
+        file = open(path)
+    except FileNotFoundError:
+        return
+
+    with file:
+        for line in file:
+            entry = line.rstrip('\n').split('\t')
+            if len(entry) == 3:
+                yield tuple(entry)
+
+
+def exportHistory(historyPath: str, path: str) -> int:
+    """Write every entry of a history file to a CSV file.
+
+    Args:
+        historyPath (str): History file to export.
+        path (str): CSV file to write, or '-' for stdout.
+
+    Returns:
+        Status (int): Exit status for the command line."""
+    try:
+        file = sys.stdout if path == '-' else open(path, 'w', newline='')
+    except OSError as error:
+        print(f"pycalc: {error}", file=sys.stderr)
+        return 1
+
+    writer = csv.writer(file)
+    writer.writerow(('backend', 'expression', 'result'))
+    writer.writerows(readHistory(historyPath))
+    if file is not sys.stdout:
+        file.close()
+
+    return 0
+
+
+def evaluateMany(
+    expressions: Iterable, model: Callable = evaluateExpression,
+    workers: int = 0, chunkSize: int = BATCH_CHUNK_SIZE
+) -> Iterator:
+    """Yield the result of each expression in order, without a GUI.
+
+    Expressions are read lazily, so results stream out as the input is
+    consumed. With a single worker everything runs in this process and
+    shares its compile cache. With more, batches are fanned out across a
+    process pool, each process keeping its own cache.
+
+    Args:
+        expressions (Iterable): Expressions to evaluate.
+        model (Callable): Function evaluating a single expression.
+        workers (int): Number of processes to use; 0 or 1 evaluates in
+            this process.
+        chunkSize (int): Expressions sent to a worker at a time.
+
+    Returns:
+        Results (Iterator): The result string of each expression."""
+    if workers <= 1:
+        for expression in expressions:
+            yield model(expression)
+
+        return
+
+    expressions = iter(expressions)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(islice(expressions, chunkSize * workers))
+            if not batch:
+                break
+
+            yield from executor.map(model, batch, chunksize=chunkSize)
+
+
+def runBatch(path: str, workers: int = 0, model: Callable = evaluateExpression) -> int:
+    """Print the result of every line of a file, one per line.
+
+    Args:
+        path (str): File of expressions, one per line, or '-' for stdin.
+        workers (int): Number of processes to evaluate with.
+        model (Callable): Function evaluating a single expression.
+
+    Returns:
+        Status (int): Exit status for the command line."""
+    try:
+        file = sys.stdin if path == '-' else open(path)
+    except OSError as error:
+        print(f"pycalc: {error}", file=sys.stderr)
+        return 1
+
+    with file:
+        expressions = (line.rstrip('\n') for line in file)
+        for result in evaluateMany(expressions, model=model, workers=workers):
+            sys.stdout.write(result + '\n')
+
+    return 0
+
+
+def parseArgs(argv: list) -> tuple:
+    """Return PyCalc's command line options and the arguments left for Qt."""
+    parser = argparse.ArgumentParser(prog="pycalc", description="PyCalc calculator")
+    parser.add_argument(
+        "--batch", metavar="FILE",
+        help="evaluate each line of FILE ('-' for stdin) and print the results"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="number of processes to evaluate a batch with"
+    )
+    parser.add_argument(
+        "--backend", choices=sorted(NUMERIC_BACKENDS), default='float',
+        help="number type to calculate with"
+    )
+    parser.add_argument(
+        "--precision", type=int, default=DEFAULT_PRECISION,
+        help="significant digits for the decimal backend"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=EVALUATION_TIMEOUT,
+        help="seconds the calculator may spend on one expression"
+    )
+    parser.add_argument(
+        "--memory-limit", type=int, default=EVALUATION_MEMORY_LIMIT // 2 ** 20,
+        help="megabytes the calculator may use for one expression"
+    )
+    parser.add_argument(
+        "--history", metavar="FILE", default=HISTORY_FILE,
+        help="file to log calculations to, '' to keep no log"
+    )
+    parser.add_argument(
+        "--export-history", metavar="FILE",
+        help="write the history to FILE ('-' for stdout) as CSV and exit"
+    )
+    parser.add_argument(
+        "--watchdog", metavar="MS", type=int, default=0,
+        help="log the GUI thread's stack when the event loop is blocked for MS milliseconds"
+    )
+    parser.add_argument(
+        "--watchdog-log", metavar="FILE",
+        help="file to append watchdog reports to (default: stderr)"
+    )
+    return parser.parse_known_args(argv)
+
+
 # Client code
 def main() -> None:
     """Combine the Model, View and controller into an app and run it."""
-    pycalc = QApplication(sys.argv)
+    args, qtArgs = parseArgs(sys.argv[1:])
+    model = partial(evaluateExpression, backend=args.backend, precision=args.precision)
+    if args.batch is not None:
+        sys.exit(runBatch(args.batch, args.workers, model))
+
+    if args.export_history is not None:
+        sys.exit(exportHistory(args.history, args.export_history))
+
+    pycalc = QApplication(sys.argv[:1] + qtArgs)
     view = PyCalcGui()
     view.show()
-    model = evaluateExpression
-    PyCalcCtrl(model=model, view=view)
-    sys.exit(pycalc.exec_())
+    worker = PyCalcWorker(model, args.timeout, args.memory_limit * 2 ** 20)
+    history = PyCalcHistory(args.history, args.backend, args.precision)
+    PyCalcCtrl(
+        model=worker, view=view, preview=PyCalcPreview(args.backend, args.precision),
+        history=history
+    )
+    watchdog = PyWatchdog(args.watchdog, args.watchdog_log, pycalc)
+    if args.watchdog:
+        watchdog.start()
+
+    status = pycalc.exec_()
+    watchdog.stop()
+    worker.close()
+    history.close()
+    sys.exit(status)
 
 
 if __name__ == '__main__':
@@ -1,42 +1,228 @@
+import argparse
+from array import array
+import bz2
+import codecs
+from contextlib import contextmanager
+from contextlib import suppress
+from functools import partial
+import glob
+import gzip
+import inspect
+import io
+from itertools import accumulate
+from itertools import islice
+import json
+import locale
+import lzma
+import mmap
 import os
 import re
+import shutil
 import sys
+import threading
+import time
 from typing import Callable
+from typing import Iterator
+from uuid import uuid4
+import zlib
 
 from PyQt5.Qt import QApplication
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtCore import QAbstractListModel
+from PyQt5.QtCore import QElapsedTimer
+from PyQt5.QtCore import QEvent
+from PyQt5.QtCore import QModelIndex
+from PyQt5.QtCore import QObject
+from PyQt5.QtCore import QT_VERSION_STR
+from PyQt5.QtCore import QResource
+from PyQt5.QtCore import QRunnable
+from PyQt5.QtCore import QSemaphore
+from PyQt5.QtCore import QStandardPaths
+from PyQt5.QtCore import QStringListModel
 from PyQt5.QtCore import Qt
+from PyQt5.QtCore import QThreadPool
+from PyQt5.QtCore import QTimer
 from PyQt5.QtGui import QFont
+from PyQt5.QtGui import QFontDatabase
+from PyQt5.QtGui import QFontInfo
 from PyQt5.QtGui import QKeySequence
 from PyQt5.QtGui import QIcon
+from PyQt5.QtGui import QIconEngine
+from PyQt5.QtGui import QPainter
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtGui import QTextDocument
+from PyQt5.QtWidgets import QAbstractScrollArea
 from PyQt5.QtWidgets import QAction
 from PyQt5.QtWidgets import QColorDialog
+from PyQt5.QtWidgets import QComboBox
+from PyQt5.QtWidgets import QCompleter
 from PyQt5.QtWidgets import QFontComboBox
 from PyQt5.QtWidgets import QFileDialog
 from PyQt5.QtWidgets import QLabel
 from PyQt5.QtWidgets import QMainWindow
 from PyQt5.QtWidgets import QMenu
 from PyQt5.QtWidgets import QMessageBox
+from PyQt5.QtWidgets import QPlainTextEdit
+from PyQt5.QtWidgets import QProgressBar
 from PyQt5.QtWidgets import QSpinBox
+from PyQt5.QtWidgets import QStyleOption
 from PyQt5.QtWidgets import QTextEdit
 from PyQt5.QtWidgets import QToolBar
 
-import qrc_resources
+from pywatchdog import PyWatchdog
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESOURCES_DIR = os.path.join(ROOT_DIR, "resources")
+RESOURCES_RCC = os.path.join(ROOT_DIR, "resources.rcc")
+ICON_SOURCE = os.getenv("PYTEXT_ICON_SOURCE", "auto")
+ICON_CACHE_DIR = os.getenv(
+    "PYTEXT_ICON_CACHE",
+    os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation), "pytext", "icons")
+)
+FONT_CACHE_PATH = os.getenv(
+    "PYTEXT_FONT_CACHE",
+    os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation), "pytext", "fonts.json")
+)
+FONTCONFIG_CACHE_DIRS = (
+    os.path.join(QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation), "fontconfig"),
+    "/var/cache/fontconfig",
+    "/usr/lib/fontconfig/cache",
+    "/usr/local/var/cache/fontconfig",
+)
+FONT_FETCH_SIZE = 64
+ROPE_LEAF_SIZE = 4096
+ASTRAL_REGEX = re.compile("[\U00010000-\U0010ffff]")
+PLAIN_TEXT_REPLACEMENTS = (
+    ("\u2029", "\n"), ("\u2028", "\n"), ("\ufdd0", "\n"), ("\ufdd1", "\n"), ("\u00a0", " "),
+)
+CHUNK_SIZE = 256 * 1024
+SNIFF_SIZE = 64 * 1024
+BYTE_ORDER_MARKS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+FALLBACK_ENCODINGS = ("cp1252", "latin-1")
+TEXT_CONTROL_BYTES = b"\t\n\r\f\b\x1b"
+MAX_CONTROL_FRACTION = 0.1
+MAX_PENDING_CHUNKS = 4
+LARGE_FILE_THRESHOLD = 256 * 1024 * 1024
+INDEX_CHUNK_SIZE = 16 * 1024 * 1024
+MAX_LINE_BYTES = 4096
+UPDATE_DELAY_MS = 50
+UPDATE_MAX_LATENCY_MS = 250
+PROFILE_PATH = os.getenv("PYTEXT_PROFILE", "")
+START_TIME = time.perf_counter()
+STALL_THRESHOLD_MS = 100
+STALL_CHECK_MS = 20
+MAX_TRACE_EVENTS = 1000000
+PLAIN_EXTENSIONS = {
+    ".txt", ".log", ".py", ".js", ".css", ".json", ".csv", ".ini", ".cfg", ".conf",
+    ".sh", ".c", ".h", ".cpp", ".java", ".xml", ".yml", ".yaml", ".toml",
+}
+COMPRESSORS = {
+    ".gz": lambda file, mode: gzip.GzipFile("", mode, fileobj=file),
+    ".bz2": bz2.BZ2File,
+    ".xz": lzma.LZMAFile,
+}
+SAVE_FORMATS = {
+    ".html": "html",
+    ".htm": "html",
+    ".rtf": "html",
+    ".doc": "html",
+    ".docx": "html",
+    ".gdoc": "html",
+    ".odf": "html",
+    ".md": "markdown",
+}
 
 class PyTextGui(QMainWindow):
     """Main Window"""
-    def __init__(self:QMainWindow, parent=None) -> None:
-        """Initialise the main window."""
+    deferredWidgetsCreated = pyqtSignal()
+    editorChanged = pyqtSignal()
+
+    def __init__(
+        self:QMainWindow, parent=None, profiler: object = None, fastStart: bool = False
+    ) -> None:
+        """Initialise the main window.
+
+        Args:
+            parent (QWidget): Parent widget.
+            profiler (PyTextProfiler): Instrumentation for slots and file
+                phases. Profiling is off by default.
+            fastStart (bool): Show the editor first and build the menus, the
+                edit and display toolbars and the font combo box once the
+                window has painted, or when first needed."""
         super().__init__(parent)
+        self.profiler = profiler or PyTextProfiler()
         self.setWindowTitle("PyText")
         self.resize(800, 800)
-        self.centralWidget = QTextEdit()
+        self.icons = PyTextIcons()
+        self.richEditor = QTextEdit()
+        self.richEditor.setCurrentFont(QFont("Courier", 10))
+        self.plainEditor = None
+        self.centralWidget = self.richEditor
         self.setCentralWidget(self.centralWidget)
-        self.centralWidget.setCurrentFont(QFont("Courier", 10))
         self.centralWidget.setFocus()
+        self.textBuffer = PyTextBuffer(self.centralWidget.document())
+        self._loader = None
+        self._loadSpan = None
+        self.fileEncoding = None
+        self.loadedAsText = False
+        self.largeFileView = None
+        self._savePool = QThreadPool(self)
+        self._savePool.setMaxThreadCount(1)
+        self._pendingSaves = []
+        self.firstPaintTime = None
+        self.fontComboBox = None
+        self.fontSizeSpinBox = None
+        self._deferredWidgetsCreated = False
         self._createActions()
-        self._createMenuBar()
-        self._createToolBars()
+        self._createFileToolBar()
         self._createStatusBar()
+        if fastStart:
+            self.addActions(self._shortcutActions())
+        else:
+            self.createDeferredWidgets()
+
+        self.centralWidget.viewport().installEventFilter(self)
+
+
+    def createDeferredWidgets(self: QMainWindow) -> None:
+        """Build the menus and the edit and display toolbars if not yet built."""
+        if self._deferredWidgetsCreated:
+            return
+
+        self._deferredWidgetsCreated = True
+        with self.profiler.span("createDeferredWidgets"):
+            self._createMenuBar()
+            self._createToolBars()
+            self._updateActions()
+
+        self.deferredWidgetsCreated.emit()
+
+
+    def eventFilter(self: QMainWindow, watched: QObject, event: QEvent) -> bool:
+        """Record when the editor first paints, then build deferred widgets."""
+        if event.type() == QEvent.Paint and self.firstPaintTime is None:
+            self.firstPaintTime = time.perf_counter() - START_TIME
+            watched.removeEventFilter(self)
+            self.statusBar.showMessage(f"Ready in {self.firstPaintTime * 1000:.0f} ms", 3000)
+            QTimer.singleShot(0, self.createDeferredWidgets)
+
+        return super().eventFilter(watched, event)
+
+
+    def _shortcutActions(self: QMainWindow) -> list:
+        """Return the actions with keyboard shortcuts."""
+        return [
+            self.newAction, self.openAction, self.saveAction, self.copyAction,
+            self.pasteAction, self.cutAction, self.textBoldAction,
+            self.textItalicAction, self.textUnderlineAction,
+        ]
 
 
     def _createMenuBar(self: QMainWindow) -> None:
@@ -54,19 +240,22 @@ class PyTextGui(QMainWindow):
         editMenu.addAction(self.pasteAction)
         editMenu.addAction(self.cutAction)
 
-        helpMenu = menuBar.addMenu(QIcon(":help-content.svg"), "&Help")
+        helpMenu = menuBar.addMenu(self.icons.icon("help-content.svg"), "&Help")
         helpMenu.addAction(self.helpAction)
         helpMenu.addAction(self.aboutAction)
     
 
-    def _createToolBars(self: QMainWindow) -> None:
-        """Create and add toolbars to main window."""
+    def _createFileToolBar(self: QMainWindow) -> None:
+        """Create the file toolbar, which is shown from the start."""
         self.fileToolBar =QToolBar(self)
         self.addToolBar(Qt.LeftToolBarArea, self.fileToolBar)
         self.fileToolBar.addAction(self.newAction)
         self.fileToolBar.addAction(self.openAction)
         self.fileToolBar.addAction(self.saveAction)
 
+
+    def _createToolBars(self: QMainWindow) -> None:
+        """Create and add the edit and display toolbars to main window."""
         self.editToolBar = QToolBar()
         self.addToolBar(Qt.RightToolBarArea, self.editToolBar)
         self.editToolBar.setAllowedAreas(Qt.LeftToolBarArea)
@@ -75,7 +264,7 @@ class PyTextGui(QMainWindow):
         self.editToolBar.addAction(self.cutAction)
 
         displayToolBar = self.addToolBar("Display")
-        self.fontComboBox = QFontComboBox(self)
+        self.fontComboBox = PyTextFontComboBox(self)
         self.fontComboBox.setFocusPolicy(Qt.NoFocus)
         self.fontComboBox.setCurrentFont(QFont("Courier", 10))
         fontTip = "Change font of selected text"
@@ -100,41 +289,41 @@ class PyTextGui(QMainWindow):
 
     def _createActions(self: QMainWindow) -> None:
         """Create actions using short constructor."""
-        self.newAction = QAction(QIcon(":file-new.svg"), "&New", self)
+        self.newAction = QAction(self.icons.icon("file-new.svg"), "&New", self)
         self.newAction.setShortcut(QKeySequence.New)
         newTip = "Create a new file"
         self.newAction.setStatusTip(newTip)
         self.newAction.setToolTip(newTip)
 
-        self.openAction = QAction(QIcon(":file-open.svg"), "&Open...", self)
+        self.openAction = QAction(self.icons.icon("file-open.svg"), "&Open...", self)
         self.openAction.setShortcut(QKeySequence.Open)
         openTip = "Open a existing file"
         self.openAction.setStatusTip(openTip)
         self.openAction.setToolTip(openTip)
 
-        self.saveAction = QAction(QIcon(":file-save.svg"), "&Save", self)
+        self.saveAction = QAction(self.icons.icon("file-save.svg"), "&Save", self)
         self.saveAction.setShortcut(QKeySequence.Save)
         saveTip = "Save current file"
         self.saveAction.setStatusTip(saveTip)
         self.saveAction.setToolTip(saveTip)
 
-        self.exitAction = QAction(QIcon(":file-exit.svg"), "&Exit", self)
+        self.exitAction = QAction(self.icons.icon("file-exit.svg"), "&Exit", self)
         exitTip = "Exit PyText"
         self.exitAction.setStatusTip(exitTip)
 
-        self.copyAction = QAction(QIcon(":edit-copy.svg"), "&Copy", self)
+        self.copyAction = QAction(self.icons.icon("edit-copy.svg"), "&Copy", self)
         self.copyAction.setShortcut(QKeySequence.Copy)
         copyTip = "Copy selected text"
         self.copyAction.setStatusTip(copyTip)
         self.copyAction.setToolTip(copyTip)
 
-        self.pasteAction = QAction(QIcon(":edit-paste.svg"), "Paste", self)
+        self.pasteAction = QAction(self.icons.icon("edit-paste.svg"), "Paste", self)
         self.pasteAction.setShortcut(QKeySequence.Paste)
         pasteTip = "Paste text into file"
         self.pasteAction.setStatusTip(pasteTip)
         self.pasteAction.setToolTip(pasteTip)
 
-        self.cutAction = QAction(QIcon(":edit-cut.svg"), "Cut", self)
+        self.cutAction = QAction(self.icons.icon("edit-cut.svg"), "Cut", self)
         self.cutAction.setShortcut(QKeySequence.Cut)
         cutTip = "Cut selected text"
         self.cutAction.setStatusTip(cutTip)
@@ -148,41 +337,41 @@ class PyTextGui(QMainWindow):
         aboutTip = "About PyText"
         self.aboutAction.setStatusTip(aboutTip)
 
-        self.textColourAction = QAction(QIcon(":text-colour.svg"), "Text Colour")
+        self.textColourAction = QAction(self.icons.icon("text-colour.svg"), "Text Colour")
         textColourTip = "Change colour of selected text"
         self.textColourAction.setStatusTip(textColourTip)
 
-        self.textHighlightAction = QAction(QIcon(":text-highlight.svg"), "Text Highlight")
+        self.textHighlightAction = QAction(self.icons.icon("text-highlight.svg"), "Text Highlight")
         textHighlightTip = "Highlight selected text with a colour"
         self.textHighlightAction.setStatusTip(textHighlightTip)
 
-        self.textFillAction = QAction(QIcon(":text-fill.svg"), "Text Fill")
+        self.textFillAction = QAction(self.icons.icon("text-fill.svg"), "Text Fill")
         textFillTip = "Set the colour of the page"
         self.textFillAction.setStatusTip(textFillTip)
 
-        self.textLeftAction = QAction(QIcon(":text-left.svg"), "Text Left")
+        self.textLeftAction = QAction(self.icons.icon("text-left.svg"), "Text Left")
         textLeftTip = "Align the current paragraph to the left"
         self.textLeftAction.setStatusTip(textLeftTip)
 
-        self.textCentreAction = QAction(QIcon(":text-centre.svg"), "Text Centre")
+        self.textCentreAction = QAction(self.icons.icon("text-centre.svg"), "Text Centre")
         textCentreTip = "Centre the current paragraph"
         self.textCentreAction.setStatusTip(textCentreTip)
 
-        self.textRightAction = QAction(QIcon(":text-right.svg"), "Text Right")
+        self.textRightAction = QAction(self.icons.icon("text-right.svg"), "Text Right")
         textRightTip = "Align the current paragraph to the right"
         self.textRightAction.setStatusTip(textRightTip)
 
-        self.textBoldAction = QAction(QIcon(":text-bold.svg"), "Text Bold")
+        self.textBoldAction = QAction(self.icons.icon("text-bold.svg"), "Text Bold")
         self.textBoldAction.setShortcut(QKeySequence.Bold)
         textBoldTip = "Change the selected text to bold"
         self.textBoldAction.setStatusTip(textBoldTip)
 
-        self.textItalicAction = QAction(QIcon(":text-italic.svg"), "Text Italic")
+        self.textItalicAction = QAction(self.icons.icon("text-italic.svg"), "Text Italic")
         self.textItalicAction.setShortcut(QKeySequence.Italic)
         textItalicTip = "Change the selected text to italic"
         self.textItalicAction.setStatusTip(textItalicTip)
     
-        self.textUnderlineAction = QAction(QIcon(":text-underline.svg"), "Text Underline")
+        self.textUnderlineAction = QAction(self.icons.icon("text-underline.svg"), "Text Underline")
         self.textUnderlineAction.setShortcut(QKeySequence.Underline)
         textUnderlineTip = "Underline the selected text"
         self.textUnderlineAction.setStatusTip(textUnderlineTip)
@@ -193,6 +382,11 @@ class PyTextGui(QMainWindow):
         self.statusBar.showMessage("Ready", 3000)
         self.wcLabel = QLabel(f"Word Count: 0")
         self.statusBar.addPermanentWidget(self.wcLabel)
+        self.progressBar = QProgressBar()
+        self.progressBar.setMaximumWidth(150)
+        self.progressBar.setRange(0, 100)
+        self.progressBar.hide()
+        self.statusBar.addPermanentWidget(self.progressBar)
 
 
     def contextMenuEvent(self: object, event: object) -> None:
@@ -211,13 +405,19 @@ class PyTextGui(QMainWindow):
     
 
     def closeEvent(self: object, event: object) -> None:
-        """Prompt to save current file then exit program."""
-        saveFile = QMessageBox.warning(
+        """Prompt to save current file then exit program.
+
+        A file still loading is only partly in the editor, so it is not
+        offered for saving."""
+        loading = self._loader is not None
+        self._cancelLoad()
+        saveFile = QMessageBox.Close if loading else QMessageBox.warning(
             self, "Save", "Save current file?", 
             QMessageBox.Save | QMessageBox.Close, QMessageBox.Close
         )
         if saveFile == QMessageBox.Save:
             self.saveFile()
+            self._savePool.waitForDone()
             event.accept()
             self.close()
         
@@ -225,58 +425,399 @@ class PyTextGui(QMainWindow):
         
 
     def newFile(self: object) -> None:
-        """Prompt user to save current file then set central widget as blank."""
-        saveFile = QMessageBox.warning(
-            self, "Save", "Save current file?", 
-            QMessageBox.Save | QMessageBox.No, QMessageBox.No
-        )
-        if saveFile == QMessageBox.Save:
-            self.saveFile()
+        """Prompt user to save current file then set central widget as blank.
+
+        There is no prompt while a file is loading, as only part of it is in
+        the editor."""
+        if self._loader is None:
+            saveFile = QMessageBox.warning(
+                self, "Save", "Save current file?", 
+                QMessageBox.Save | QMessageBox.No, QMessageBox.No
+            )
+            if saveFile == QMessageBox.Save:
+                self.saveFile()
 
+        self._cancelLoad()
+        self._closeLargeFile()
+        self.useEditor(plain=False)
         self.centralWidget.setText("")
+        self.fileEncoding = None
+        self.loadedAsText = False
 
 
     def openFile(self: object) -> None:
-        """Prompt to save current file then select file to open."""
-        saveFile = QMessageBox.warning(
-            self, "Save", "Save current file?", 
-            QMessageBox.Save | QMessageBox.No, QMessageBox.No
-        )
-        if saveFile == QMessageBox.Save:
-            self.saveFile()
+        """Prompt to save current file then select file to open.
+
+        There is no prompt while a file is loading, as only part of it is in
+        the editor."""
+        if self._loader is None:
+            saveFile = QMessageBox.warning(
+                self, "Save", "Save current file?", 
+                QMessageBox.Save | QMessageBox.No, QMessageBox.No
+            )
+            if saveFile == QMessageBox.Save:
+                self.saveFile()
 
         openFileDialog = QFileDialog.getOpenFileName(
             self, "Open File", os.getenv("HOME"), 
-            "All Files (*);; Text Files (*.txt);; Rich Text Files (*.rtf);; Documents (*.doc);; DocX (*.docx);; GoogleDoc (*.gdoc);; LibreOffice Doc (*.odf);; HTML (*.html);; MarkDown (*.md);; Python (*.py);; JavaScript (*.js);; Cascading Stylesheets (*.css)"
+            "All Files (*);; Text Files (*.txt);; Rich Text Files (*.rtf);; Documents (*.doc);; DocX (*.docx);; GoogleDoc (*.gdoc);; LibreOffice Doc (*.odf);; HTML (*.html);; MarkDown (*.md);; Python (*.py);; JavaScript (*.js);; Cascading Stylesheets (*.css);; Compressed Files (*.gz *.bz2 *.xz)"
         )
-        with open(openFileDialog[0], "r") as file:
-            text = file.read()
-            self.centralWidget.setText(text)
+        if openFileDialog[0]:
+            self.openPath(openFileDialog[0])
+
+
+    def openPath(self: object, path: str) -> None:
+        """Open a file in the editor, or the large file viewer if it is big.
+
+        Compressed files always stream into the editor, as the viewer maps
+        the bytes on disk.
+
+        Args:
+            path (str): Path of the file to open."""
+        compressed = splitCompression(path)[1] is not None
+        if not compressed and os.path.getsize(path) >= LARGE_FILE_THRESHOLD:
+            self.viewLargeFile(path)
+        else:
+            self.loadFile(path)
+
+
+    def viewLargeFile(self: object, path: str) -> None:
+        """Show a file read only through a memory-mapped viewer.
+
+        Only the visible lines are decoded and drawn, so memory use does not
+        grow with the size of the file. Falls back to loadFile when the file
+        cannot be mapped.
+
+        Args:
+            path (str): Path of the file to view."""
+        self._cancelLoad()
+        self._closeLargeFile()
+        try:
+            viewer = PyTextLargeFileView(path, self)
+        except (OSError, ValueError):
+            self.loadFile(path)
+            return
 
+        viewer.lineCountChanged.connect(
+            lambda count: self.wcLabel.setText(f"Line Count: {count}")
+        )
+        self.takeCentralWidget()
+        self.setCentralWidget(viewer)
+        self.largeFileView = viewer
+        self._updateActions()
+        viewer.setFocus()
         fileNameRegEx = r'\b\w+.\w+\b'
-        filename = re.findall(fileNameRegEx, openFileDialog[0])[0]
+        filename = re.findall(fileNameRegEx, path)[0]
+        self.setWindowTitle(f"PyText - {filename} [read only]")
+        self.statusBar.showMessage(f"Viewing {path} read only", 3000)
+
+
+    def _closeLargeFile(self: object) -> None:
+        """Swap the large file viewer back out for the editor."""
+        if self.largeFileView is None:
+            return
+
+        viewer = self.takeCentralWidget()
+        viewer.close()
+        viewer.deleteLater()
+        self.largeFileView = None
+        self.setCentralWidget(self.centralWidget)
+        self._updateActions()
+        self.centralWidget.setFocus()
+
+
+    def isPlain(self: object) -> bool:
+        """Return True if the plain text editor is in use."""
+        return self.centralWidget is self.plainEditor
+
+
+    def useEditor(self: object, plain: bool) -> None:
+        """Switch between the rich and plain text editors.
+
+        The plain editor is a QPlainTextEdit, which lays out only the blocks
+        it draws and keeps no character formats, so large plain files take
+        less memory and scroll quickly. The editor being left is cleared.
+
+        Args:
+            plain (bool): True for the plain text editor."""
+        if plain == self.isPlain():
+            return
+
+        if plain and self.plainEditor is None:
+            self.plainEditor = QPlainTextEdit()
+            self.plainEditor.setFont(QFont("Courier", 10))
+
+        previous = self.centralWidget
+        self.centralWidget = self.plainEditor if plain else self.richEditor
+        if self.largeFileView is None:
+            self.takeCentralWidget()
+            self.setCentralWidget(self.centralWidget)
+            self.centralWidget.setFocus()
+
+        previous.clear()
+        self.textBuffer = PyTextBuffer(self.centralWidget.document())
+        self._updateActions()
+        self.editorChanged.emit()
+
+
+    def _updateActions(self: object) -> None:
+        """Enable the actions that suit the widget being shown.
+
+        Nothing acts on the large file viewer's text, the plain text editor
+        has no character or paragraph formats, and a file that is still
+        loading cannot be saved over with the part that has arrived."""
+        editing = self.largeFileView is None
+        formatting = editing and not self.isPlain()
+        self.saveAction.setEnabled(editing and self._loader is None)
+        for action in (self.copyAction, self.pasteAction, self.cutAction, self.textFillAction):
+            action.setEnabled(editing)
+
+        for action in (
+            self.textColourAction, self.textHighlightAction, self.textLeftAction,
+            self.textCentreAction, self.textRightAction, self.textBoldAction,
+            self.textItalicAction, self.textUnderlineAction
+        ):
+            action.setEnabled(formatting)
+
+        if self.fontComboBox is not None:
+            self.fontComboBox.setEnabled(formatting)
+            self.fontSizeSpinBox.setEnabled(formatting)
+
+
+    def loadFile(self: object, path: str) -> None:
+        """Stream a file into centralWidget in chunks read on a worker thread.
+
+        The editor is read only until the load completes, but the text that
+        has arrived so far can be scrolled and read straight away. The
+        encoding is detected by the loader and kept in fileEncoding. Files with
+        an extension in PLAIN_EXTENSIONS open in the plain text editor, looking
+        past a compression suffix from COMPRESSORS.
+
+        Args:
+            path (str): Path of the file to open."""
+        self._cancelLoad()
+        self._closeLargeFile()
+        plain = os.path.splitext(splitCompression(path)[0])[1].lower() in PLAIN_EXTENSIONS
+        self.useEditor(plain)
+        document = self.centralWidget.document()
+        document.setUndoRedoEnabled(False)
+        self.centralWidget.clear()
+        self.centralWidget.setReadOnly(True)
+        self._loadIsRich = False if plain else None
+        self._richChunks = []
+        self.fileEncoding = None
+        self.progressBar.setValue(0)
+        self.progressBar.show()
+        self.statusBar.showMessage(f"Opening {path}...")
+
+        loader = PyTextFileLoader(path)
+        connect = self.profiler.connect
+        connect(loader.signals.chunkRead, partial(self._appendChunk, loader), "appendChunk")
+        connect(loader.signals.progress, partial(self._loadProgress, loader), "loadProgress")
+        connect(loader.signals.finished, partial(self._finishLoad, loader), "finishLoad")
+        connect(loader.signals.failed, partial(self._failLoad, loader), "failLoad")
+        self._loader = loader
+        self._updateActions()
+        self._loadSpan = self.profiler.begin("open", path=path)
+        QThreadPool.globalInstance().start(loader)
+
+
+    def _appendChunk(self: object, loader: QRunnable, text: str) -> None:
+        """Append a chunk of text from the loader to the end of the document."""
+        if loader is not self._loader:
+            return
+
+        if self._loadIsRich is None:
+            self._loadIsRich = Qt.mightBeRichText(text)
+
+        if self._loadIsRich:
+            self._richChunks.append(text)
+        else:
+            cursor = QTextCursor(self.centralWidget.document())
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText(text)
+
+        loader.chunkConsumed()
+
+
+    def _loadProgress(self: object, loader: QRunnable, percent: int) -> None:
+        """Show how much of the file has been read."""
+        if loader is self._loader:
+            self.progressBar.setValue(percent)
+
+
+    def _finishLoad(self: object, loader: QRunnable) -> None:
+        """Complete a load, rendering rich text files in one go."""
+        if loader is not self._loader:
+            return
+
+        if self._loadIsRich:
+            with self.profiler.span("renderRichText"):
+                text = "".join(self._richChunks)
+                self._richChunks = []
+                self.centralWidget.setText(text)
+
+        self._endLoad()
+        self.fileEncoding = loader.encoding
+        self.loadedAsText = not self._loadIsRich
+        fileNameRegEx = r'\b\w+.\w+\b'
+        filename = re.findall(fileNameRegEx, loader.path)[0]
         self.setWindowTitle(f"PyText - {filename}")
-        self.statusBar.showMessage(f"Opened {openFileDialog}", 3000)
+        if loader.replacedBytes:
+            self.statusBar.showMessage(
+                f"Opened {loader.path} ({loader.encoding}), bytes that could not be "
+                "decoded were replaced and will be lost on saving", 5000
+            )
+        else:
+            self.statusBar.showMessage(f"Opened {loader.path} ({loader.encoding})", 3000)
+
+
+    def _failLoad(self: object, loader: QRunnable, message: str) -> None:
+        """Report a file that could not be read, discarding the part read.
+
+        The text that arrived is cleared before undo is enabled again, so it
+        can neither be saved over the file nor brought back by undo."""
+        if loader is not self._loader:
+            return
+
+        self.centralWidget.clear()
+        self._endLoad()
+        self.setWindowTitle("PyText")
+        self.statusBar.showMessage(f"Could not open {loader.path}: {message}", 5000)
+
+
+    def _endLoad(self: object) -> None:
+        """Return the editor to its normal state after a load."""
+        self.profiler.end(self._loadSpan)
+        self._loader = None
+        self._updateActions()
+        self._loadSpan = None
+        self._richChunks = []
+        self.centralWidget.setReadOnly(False)
+        self.centralWidget.document().setUndoRedoEnabled(True)
+        self.progressBar.hide()
+
+
+    def _cancelLoad(self: object) -> None:
+        """Stop any load in progress."""
+        if self._loader is not None:
+            self._loader.cancel()
+            self._endLoad()
 
 
     def saveFile(self: object) -> None:
-        """Save contents of centralWidget as a file."""
-        try:
-            saveFileDialog = QFileDialog.getSaveFileName(
-                self, "Save File", os.getenv("HOME"), 
-                "All Files (*);; Text Files (*.txt);; Rich Text Files (*.rtf);; Documents (*.doc);; DocX (*.docx);; GoogleDoc (*.gdoc);; LibreOffice Doc (*.odf);; HTML (*.html);; MarkDown (*.md);; Python (*.py);; JavaScript (*.js);; Cascading Stylesheets (*.css)"
+        """Save contents of centralWidget as a file.
+
+        Choosing the compressed files filter adds its first suffix to a name
+        without one, as the suffix is what selects the compression."""
+        if self.largeFileView is not None:
+            self.statusBar.showMessage("Large files are opened read only", 3000)
+            return
+
+        if self._loader is not None:
+            self.statusBar.showMessage("Wait for the file to finish opening before saving", 3000)
+            return
+
+        saveFileDialog = QFileDialog.getSaveFileName(
+            self, "Save File", os.getenv("HOME"), 
+            "All Files (*);; Text Files (*.txt);; Rich Text Files (*.rtf);; Documents (*.doc);; DocX (*.docx);; GoogleDoc (*.gdoc);; LibreOffice Doc (*.odf);; HTML (*.html);; MarkDown (*.md);; Python (*.py);; JavaScript (*.js);; Cascading Stylesheets (*.css);; Compressed Files (*.gz *.bz2 *.xz)"
+        )
+        path, selectedFilter = saveFileDialog
+        if path:
+            match = re.search(r'\*(\.\w+)', selectedFilter)
+            if match and match.group(1) in COMPRESSORS and splitCompression(path)[1] is None:
+                path += match.group(1)
+
+            self.writeFile(path, self._saveFormat(path, selectedFilter))
+
+
+    def _saveFormat(self: object, path: str, selectedFilter: str = "") -> str:
+        """Return the format to save a file as, from SAVE_FORMATS.
+
+        The file's extension, ignoring a compression suffix, is used, or the
+        selected dialog filter's when the name has none. Anything not listed
+        is saved as plain text.
+
+        Args:
+            path (str): Path of the file to save.
+            selectedFilter (str): Filter chosen in the save dialog."""
+        extension = os.path.splitext(splitCompression(path)[0])[1].lower()
+        if not extension:
+            match = re.search(r'\*(\.\w+)', selectedFilter)
+            extension = match.group(1) if match else ""
+
+        return SAVE_FORMATS.get(extension, "plain")
+
+
+    def _serialise(self: object, fileFormat: str) -> object:
+        """Return the document as html or markdown, or a plain text snapshot.
+
+        A file opened as text, such as Markdown source, is already in its
+        format, and toMarkdown() would make each of its lines a paragraph,
+        so it is saved as plain text."""
+        if fileFormat == "html":
+            return self.centralWidget.document().toHtml()
+
+        if fileFormat == "markdown" and not self.loadedAsText:
+            return self.centralWidget.document().toMarkdown()
+
+        return self.textBuffer.snapshot()
+
+
+    def writeFile(self: object, path: str, fileFormat: str = None) -> None:
+        """Write a snapshot of the document to a file on a worker thread.
+
+        A QTextDocument cannot be shared between threads, so the snapshot is
+        taken here, as text or as the buffer's immutable rope for plain text,
+        and the encoding, writing and syncing to disk are left to the worker.
+        Plain text is written in the encoding and line ending the file was
+        opened with, falling back to UTF-8 for text that encoding cannot hold.
+
+        Args:
+            path (str): Path of the file to write.
+            fileFormat (str): One of "html", "markdown" or "plain". Chosen from
+                the path's extension when not given."""
+        if self._loader is not None:
+            self.statusBar.showMessage("Wait for the file to finish opening before saving", 3000)
+            return
+
+        fileFormat = fileFormat or self._saveFormat(path)
+        span = self.profiler.begin("save", path=path, format=fileFormat)
+        with self.profiler.span("serialise", format=fileFormat):
+            text = self._serialise(fileFormat)
+
+        encoding = self.fileEncoding if fileFormat == "plain" else PyTextEncoding("utf-8")
+        saver = PyTextFileSaver(path, text, encoding)
+        saver.span = span
+        connect = self.profiler.connect
+        connect(saver.signals.finished, partial(self._finishSave, saver), "finishSave")
+        connect(saver.signals.failed, partial(self._failSave, saver), "failSave")
+        self._pendingSaves.append(saver)
+        self.statusBar.showMessage(f"Saving {path}...")
+        self._savePool.start(saver)
+
+
+    def _finishSave(self: object, saver: QRunnable) -> None:
+        """Report a completed save."""
+        self.profiler.end(saver.span)
+        self._pendingSaves.remove(saver)
+        fileNameRegEx = r'\b\w+.\w+\b'
+        filename = re.findall(fileNameRegEx, saver.path)[0]
+        self.setWindowTitle(f"PyText - {filename}")
+        if saver.encoding is not saver.requestedEncoding:
+            self.fileEncoding = saver.encoding
+            self.statusBar.showMessage(
+                f"File saved as {saver.encoding}, it cannot be encoded in {saver.requestedEncoding}", 5000
             )
-            with open(saveFileDialog[0], "w") as file:
-                text = self.centralWidget.toHtml()
-                file.write(text)
-                
-            fileNameRegEx = r'\b\w+.\w+\b'
-            filename = re.findall(fileNameRegEx, saveFileDialog[0])[0]
-            self.setWindowTitle(f"PyText - {filename}")
+        else:
             self.statusBar.showMessage(f"File saved", 3000)
 
-        except FileNotFoundError:
-            pass
+
+    def _failSave(self: object, saver: QRunnable, message: str) -> None:
+        """Report a save that could not be written."""
+        self.profiler.end(saver.span)
+        self._pendingSaves.remove(saver)
+        self.statusBar.showMessage(f"Could not save {saver.path}: {message}", 5000)
 
 
     def help(self: object) -> None:
@@ -351,6 +892,614 @@ class PyTextGui(QMainWindow):
             self.centralWidget.setFontUnderline(True)
 
 
+class PyTextIcons:
+    """Source of the application's icons, registering resources on first use."""
+    def __init__(
+        self: object, source: str = ICON_SOURCE, cacheDir: str = ICON_CACHE_DIR
+    ) -> None:
+        """Initialise the icon source without loading anything.
+
+        Args:
+            source (str): Where to load icons from: "rcc" for a binary
+                resources.rcc, "files" for the resources directory, "qrc" for
+                the compiled qrc_resources module, or "auto" for the first of
+                those that is available.
+            cacheDir (str): Directory of pre-rendered icon PNGs. An empty
+                string disables the cache."""
+        self.source = self._resolveSource(source)
+        self.cacheDir = cacheDir
+        self._prefix = None
+
+
+    def icon(self: object, name: str) -> QIcon:
+        """Return an icon that is only loaded when first drawn.
+
+        Args:
+            name (str): File name of the icon, as aliased in resources.qrc."""
+        return QIcon(PyTextIconEngine(self, name))
+
+
+    def path(self: object, name: str) -> str:
+        """Return the path to load an icon from, registering resources if needed."""
+        if self._prefix is None:
+            self._prefix = self._register()
+
+        return self._prefix + name
+
+
+    def pixmap(self: object, name: str, size: object, render: Callable) -> QPixmap:
+        """Return an icon rendered at size, from the on-disk cache when possible.
+
+        Cached PNGs are keyed by icon, size, device pixel ratio and the
+        modification time of the icon's source, so a cache hit skips parsing
+        and rasterising the SVG altogether.
+
+        Args:
+            name (str): File name of the icon.
+            size (QSize): Size of the pixmap in device pixels.
+            render (Callable): Function rendering the icon at size on a miss."""
+        cachePath = self._cachePath(name, size)
+        pixmap = QPixmap()
+        if cachePath and pixmap.load(cachePath, "PNG"):
+            return pixmap
+
+        pixmap = render(size)
+        if cachePath and not pixmap.isNull():
+            try:
+                os.makedirs(self.cacheDir, exist_ok=True)
+                for stale in glob.glob(cachePath.rsplit("-", 1)[0] + "-*.png"):
+                    os.remove(stale)
+
+            except OSError:
+                return pixmap
+
+            pixmap.save(cachePath, "PNG")
+
+        return pixmap
+
+
+    def _cachePath(self: object, name: str, size: object) -> str:
+        """Return the cache file for an icon at size, or "" if it has no source."""
+        if not self.cacheDir:
+            return ""
+
+        if self.source == "files":
+            sourcePath = os.path.join(RESOURCES_DIR, name)
+        elif self.source == "rcc":
+            sourcePath = RESOURCES_RCC
+        else:
+            sourcePath = os.path.join(ROOT_DIR, "qrc_resources.py")
+
+        try:
+            mtime = os.stat(sourcePath).st_mtime_ns
+        except OSError:
+            return ""
+
+        stem = os.path.splitext(name)[0]
+        ratio = f"{QApplication.instance().devicePixelRatio():g}"
+        fileName = f"{stem}-{size.width()}x{size.height()}@{ratio}-{mtime}.png"
+        return os.path.join(self.cacheDir, fileName)
+
+
+    def _resolveSource(self: object, source: str) -> str:
+        """Return the source "auto" stands for, without loading anything."""
+        if source != "auto":
+            return source
+
+        if os.path.exists(RESOURCES_RCC):
+            return "rcc"
+
+        if os.path.isdir(RESOURCES_DIR):
+            return "files"
+
+        return "qrc"
+
+
+    def _register(self: object) -> str:
+        """Make the icons available and return the prefix for their paths."""
+        if self.source == "rcc" and QResource.registerResource(RESOURCES_RCC):
+            return ":"
+
+        if self.source == "files" and os.path.isdir(RESOURCES_DIR):
+            return RESOURCES_DIR + os.sep
+
+        import qrc_resources
+        return ":"
+
+
+class PyTextIconEngine(QIconEngine):
+    """Icon engine that defers reading and parsing an icon until it is drawn."""
+    def __init__(self: QIconEngine, icons: PyTextIcons, name: str) -> None:
+        """Initialise the engine.
+
+        Args:
+            icons (PyTextIcons): Source to load the icon from.
+            name (str): File name of the icon."""
+        super().__init__()
+        self._icons = icons
+        self._name = name
+        self._icon = None
+        self._pixmaps = {}
+
+
+    def _load(self: QIconEngine) -> QIcon:
+        """Return the real icon, loading it on first use."""
+        if self._icon is None:
+            self._icon = QIcon(self._icons.path(self._name))
+
+        return self._icon
+
+
+    def _render(self: QIconEngine, size: object) -> QPixmap:
+        """Rasterise the real icon at size."""
+        return self._load().pixmap(size)
+
+
+    def paint(self: QIconEngine, painter: QPainter, rect: object, mode: object, state: object) -> None:
+        """Draw the icon into rect."""
+        ratio = painter.device().devicePixelRatioF()
+        pixmap = self.pixmap(rect.size() * ratio, mode, state)
+        painter.drawPixmap(rect, pixmap)
+
+
+    def pixmap(self: QIconEngine, size: object, mode: object, state: object) -> QPixmap:
+        """Return the icon rendered at size, loading it from the icon cache."""
+        key = (size.width(), size.height(), mode, state)
+        if key not in self._pixmaps:
+            pixmap = self._icons.pixmap(self._name, size, self._render)
+            if mode != QIcon.Normal:
+                style = QApplication.instance().style()
+                pixmap = style.generatedIconPixmap(mode, pixmap, QStyleOption())
+
+            self._pixmaps[key] = pixmap
+
+        return self._pixmaps[key]
+
+
+    def actualSize(self: QIconEngine, size: object, mode: object, state: object) -> object:
+        """Return size unchanged, as the SVG icons scale to any size."""
+        return size
+
+
+    def clone(self: QIconEngine) -> QIconEngine:
+        """Return a copy of the engine sharing the same icon source."""
+        return PyTextIconEngine(self._icons, self._name)
+
+
+class PyTextLoaderSignals(QObject):
+    """Signals emitted by a PyTextFileLoader."""
+    chunkRead = pyqtSignal(object)
+    progress = pyqtSignal(int)
+    finished = pyqtSignal()
+    failed = pyqtSignal(str)
+
+
+class PyTextFileLoader(QRunnable):
+    """Worker reading and decoding a file in fixed-size chunks."""
+    def __init__(self: QRunnable, path: str, chunkSize: int = CHUNK_SIZE) -> None:
+        """Initialise the loader.
+
+        Memory use is bounded by the chunk size: bytes are read into one
+        reused buffer, and at most MAX_PENDING_CHUNKS decoded chunks wait
+        for the GUI. Chunks are emitted as Python objects, so the queued
+        signal passes a reference instead of converting each one to a
+        QString and back.
+
+        Args:
+            path (str): Path of the file to read.
+            chunkSize (int): Number of bytes read at a time."""
+        super().__init__()
+        self.path = path
+        self.signals = PyTextLoaderSignals()
+        self._chunkSize = chunkSize
+        self._slots = QSemaphore(MAX_PENDING_CHUNKS)
+        self._cancelled = False
+        self.encoding = None
+        self.replacedBytes = False
+
+
+    def run(self: QRunnable) -> None:
+        """Read the file, emitting decoded chunks until done or cancelled.
+
+        The encoding is detected from the first chunk, before anything is
+        emitted, and kept in the encoding attribute. Binary files fail
+        without emitting any text. Bytes the encoding cannot decode are
+        replaced with U+FFFD, and replacedBytes is set. Files named with a suffix from COMPRESSORS
+        are decompressed as they are read, and progress follows the
+        compressed bytes consumed."""
+        compressor = splitCompression(self.path)[1]
+        try:
+            size = os.path.getsize(self.path)
+            buffer = bytearray(max(self._chunkSize, SNIFF_SIZE))
+            view = memoryview(buffer)
+            with open(self.path, "rb", buffering=0) as raw, \
+                    (compressor(raw, "rb") if compressor else raw) as file:
+                data = view[:file.readinto(buffer)]
+                encoding = PyTextEncoding.detect(data, final=len(data) < len(buffer))
+                if encoding is None:
+                    self.signals.failed.emit("it looks like a binary file")
+                    return
+
+                self.encoding = encoding
+                byteDecoder = codecs.getincrementaldecoder(encoding.name)()
+                decoder = io.IncrementalNewlineDecoder(byteDecoder, translate=True)
+                data = data[len(encoding.bom):]
+                while not self._cancelled:
+                    try:
+                        text = decoder.decode(data, final=not data)
+                    except UnicodeDecodeError:
+                        self.replacedBytes = True
+                        byteDecoder.errors = "replace"
+                        text = decoder.decode(data, final=not data)
+                    if text and self._waitForSlot():
+                        self.signals.chunkRead.emit(text)
+
+                    if size:
+                        self.signals.progress.emit(min(100, raw.tell() * 100 // size))
+
+                    if not data:
+                        break
+
+                    data = view[:file.readinto(view[:self._chunkSize])]
+
+            encoding.newline = PyTextEncoding.newlineOf(decoder.newlines)
+
+        except (OSError, EOFError, lzma.LZMAError, zlib.error) as error:
+            self.signals.failed.emit(str(error))
+            return
+
+        except Exception as error:
+            # PyQt aborts the application when an exception escapes run.
+            self.signals.failed.emit(f"{type(error).__name__}: {error}")
+            return
+
+        if not self._cancelled:
+            self.signals.finished.emit()
+
+
+    def _waitForSlot(self: QRunnable) -> bool:
+        """Block until the GUI has room for another chunk or the load is cancelled."""
+        while not self._cancelled:
+            if self._slots.tryAcquire(1, 100):
+                return True
+
+        return False
+
+
+    def chunkConsumed(self: QRunnable) -> None:
+        """Signal that the GUI has appended a chunk."""
+        self._slots.release()
+
+
+    def cancel(self: QRunnable) -> None:
+        """Stop reading at the next chunk."""
+        self._cancelled = True
+
+
+class PyTextSaverSignals(QObject):
+    """Signals emitted by a PyTextFileSaver."""
+    finished = pyqtSignal()
+    failed = pyqtSignal(str)
+
+
+class PyTextFileSaver(QRunnable):
+    """Worker writing a document snapshot and committing it atomically."""
+    def __init__(self: QRunnable, path: str, text: object, encoding: object = None) -> None:
+        """Initialise the saver.
+
+        Args:
+            path (str): Path of the file to write.
+            text (object): Snapshot of the document to write, as a string or
+                a PyTextRope, which is written a leaf at a time.
+            encoding (PyTextEncoding): Encoding, byte order mark and line
+                ending to write. Defaults to the locale's encoding."""
+        super().__init__()
+        self.path = path
+        self.signals = PyTextSaverSignals()
+        self._text = text
+        self.encoding = encoding or PyTextEncoding()
+        self.requestedEncoding = self.encoding
+
+
+    def run(self: QRunnable) -> None:
+        """Write to a temporary file beside the target then rename it into place."""
+        directory, basename = os.path.split(os.path.abspath(self.path))
+        tempPath = os.path.join(directory, f".{basename}.{uuid4().hex}.tmp")
+        try:
+            try:
+                self._write(tempPath)
+            except UnicodeEncodeError:
+                os.remove(tempPath)
+                self.encoding = PyTextEncoding("utf-8", newline=self.encoding.newline)
+                self._write(tempPath)
+
+            if os.path.exists(self.path):
+                shutil.copymode(self.path, tempPath)
+
+            os.replace(tempPath, self.path)
+
+        except Exception as error:
+            # PyQt aborts the application when an exception escapes run.
+            with suppress(OSError):
+                os.remove(tempPath)
+
+            if isinstance(error, OSError):
+                self.signals.failed.emit(str(error))
+            else:
+                self.signals.failed.emit(f"{type(error).__name__}: {error}")
+
+            return
+
+        self.signals.finished.emit()
+
+
+    def _write(self: QRunnable, path: str) -> None:
+        """Write the text to a new file at path and sync it to disk.
+
+        The text is compressed as it is written when the target path, not the
+        temporary one, ends with a suffix from COMPRESSORS.
+
+        Raises:
+            UnicodeEncodeError: If the text cannot be encoded."""
+        compressor = splitCompression(self.path)[1]
+        with open(path, "xb") as raw:
+            stream = compressor(raw, "wb") if compressor else raw
+            stream.write(self.encoding.bom)
+            file = io.TextIOWrapper(stream, self.encoding.name, newline=self.encoding.newline)
+            if isinstance(self._text, str):
+                file.write(self._text)
+            else:
+                file.writelines(self._text.chunks())
+
+            file.flush()
+            file.detach()
+            if stream is not raw:
+                stream.close()
+
+            raw.flush()
+            os.fsync(raw.fileno())
+
+
+class PyTextEncoding:
+    """How a file's text is encoded: codec, byte order mark and line ending."""
+    def __init__(self: object, name: str = None, bom: bytes = b"", newline: str = None) -> None:
+        """Initialise the encoding.
+
+        Args:
+            name (str): Codec name. Defaults to the locale's encoding.
+            bom (bytes): Byte order mark written before the text.
+            newline (str): Line ending to write, or None for the platform's."""
+        self.name = name or locale.getpreferredencoding(False)
+        self.bom = bom
+        self.newline = newline
+
+
+    def __repr__(self: object) -> str:
+        """Return the codec name, noting a byte order mark."""
+        return f"{self.name} with BOM" if self.bom else self.name
+
+
+    @classmethod
+    def detect(cls: type, prefix: bytes, final: bool = False) -> object:
+        """Return the encoding of a file from its first bytes, or None if binary.
+
+        A byte order mark decides outright. Otherwise UTF-16 without a mark
+        is recognised by its alternating zero bytes, any other zero byte or
+        a high share of control characters means binary, and the first of
+        UTF-8, the locale's encoding and FALLBACK_ENCODINGS that decodes the
+        prefix is chosen.
+
+        Args:
+            prefix (bytes): The start of the file, ideally SNIFF_SIZE bytes.
+            final (bool): True if prefix is the whole file, so a multibyte
+                character cut off at its end is an error."""
+        final = final and len(prefix) <= SNIFF_SIZE
+        prefix = bytes(prefix[:SNIFF_SIZE])
+        for bom, name in BYTE_ORDER_MARKS:
+            if prefix.startswith(bom):
+                return cls(name, bom)
+
+        if b"\x00" in prefix:
+            evenZeros = prefix[0::2].count(0)
+            oddZeros = prefix[1::2].count(0)
+            half = len(prefix) // 2 or 1
+            if oddZeros > half * 0.4 and evenZeros < half * 0.05:
+                return cls("utf-16-le")
+
+            if evenZeros > half * 0.4 and oddZeros < half * 0.05:
+                return cls("utf-16-be")
+
+            return None
+
+        controls = sum(prefix.count(byte) for byte in range(32) if byte not in TEXT_CONTROL_BYTES)
+        if controls > len(prefix) * MAX_CONTROL_FRACTION:
+            return None
+
+        candidates = ["utf-8", locale.getpreferredencoding(False), *FALLBACK_ENCODINGS]
+        for name in dict.fromkeys(codecs.lookup(name).name for name in candidates):
+            try:
+                codecs.getincrementaldecoder(name)().decode(prefix, final=final)
+            except UnicodeDecodeError:
+                continue
+
+            return cls(name)
+
+        return cls("latin-1")
+
+
+    @staticmethod
+    def newlineOf(newlines: object) -> str:
+        """Return the line ending to save with, from a decoder's newlines.
+
+        Files that consistently used one ending keep it; new and mixed files
+        are written with the platform's."""
+        return newlines if isinstance(newlines, str) else None
+
+
+class PyTextLargeFileView(QAbstractScrollArea):
+    """Read only viewer drawing the visible lines of a memory-mapped file."""
+    lineCountChanged = pyqtSignal(int)
+
+    def __init__(self: QAbstractScrollArea, path: str, parent=None) -> None:
+        """Map the file and start indexing its lines.
+
+        Args:
+            path (str): Path of the file to view."""
+        super().__init__(parent)
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self._file.close()
+            raise
+
+        encoding = PyTextEncoding.detect(self._map[:SNIFF_SIZE])
+        if encoding is None or encoding.name.startswith(("utf-16", "utf-32")):
+            self._map.close()
+            self._file.close()
+            raise ValueError(f"cannot view {encoding or 'binary'} files line by line")
+
+        self.encoding = encoding
+        self._lineOffsets = array("Q", [len(encoding.bom)])
+        self._maxLineWidth = 0
+        self.setFont(QFont("Courier", 10))
+        self._indexer = PyTextLineIndexer(self._map, self._lineOffsets)
+        self._indexer.signals.progress.connect(self._linesIndexed)
+        self._indexer.signals.finished.connect(self._linesIndexed)
+        QThreadPool.globalInstance().start(self._indexer)
+        self._updateScrollBars()
+
+
+    def lineCount(self: QAbstractScrollArea) -> int:
+        """Return the number of lines indexed so far."""
+        return len(self._lineOffsets)
+
+
+    def lineText(self: QAbstractScrollArea, number: int) -> str:
+        """Return the decoded text of a line, truncated to MAX_LINE_BYTES.
+
+        Args:
+            number (int): Zero based line number."""
+        start = self._lineOffsets[number]
+        if number + 1 < len(self._lineOffsets):
+            end = self._lineOffsets[number + 1] - 1
+        else:
+            end = len(self._map)
+
+        data = self._map[start:min(end, start + MAX_LINE_BYTES)]
+        return data.decode(self.encoding.name, errors="replace").rstrip("\r").expandtabs(4)
+
+
+    def scrollToLine(self: QAbstractScrollArea, number: int) -> None:
+        """Scroll so that the given line is at the top of the viewport."""
+        self.verticalScrollBar().setValue(number)
+
+
+    def close(self: QAbstractScrollArea) -> bool:
+        """Stop indexing and release the mapped file."""
+        self._indexer.cancel()
+        self._map.close()
+        self._file.close()
+        return super().close()
+
+
+    def _linesIndexed(self: QAbstractScrollArea) -> None:
+        """Extend the scroll range as the indexer finds more lines."""
+        self._updateScrollBars()
+        self.lineCountChanged.emit(self.lineCount())
+        self.viewport().update()
+
+
+    def _visibleLines(self: QAbstractScrollArea) -> int:
+        """Return the number of lines that fit in the viewport."""
+        return max(1, self.viewport().height() // self.fontMetrics().lineSpacing())
+
+
+    def _updateScrollBars(self: QAbstractScrollArea) -> None:
+        """Set scroll bar ranges from the line count and widest line seen."""
+        visible = self._visibleLines()
+        self.verticalScrollBar().setPageStep(visible)
+        self.verticalScrollBar().setRange(0, max(0, self.lineCount() - visible))
+        width = self.viewport().width()
+        self.horizontalScrollBar().setPageStep(width)
+        self.horizontalScrollBar().setRange(0, max(0, self._maxLineWidth - width))
+
+
+    def resizeEvent(self: QAbstractScrollArea, event: object) -> None:
+        """Recalculate the scroll ranges for the new viewport size."""
+        super().resizeEvent(event)
+        self._updateScrollBars()
+
+
+    def paintEvent(self: QAbstractScrollArea, event: object) -> None:
+        """Draw only the lines currently in view."""
+        painter = QPainter(self.viewport())
+        metrics = self.fontMetrics()
+        lineHeight = metrics.lineSpacing()
+        first = self.verticalScrollBar().value()
+        last = min(self.lineCount(), first + self._visibleLines() + 1)
+        x = 4 - self.horizontalScrollBar().value()
+        widest = self._maxLineWidth
+        for row, number in enumerate(range(first, last)):
+            text = self.lineText(number)
+            painter.drawText(x, row * lineHeight + metrics.ascent(), text)
+            widest = max(widest, metrics.horizontalAdvance(text) + 8)
+
+        painter.end()
+        if widest != self._maxLineWidth:
+            self._maxLineWidth = widest
+            self._updateScrollBars()
+
+
+class PyTextIndexerSignals(QObject):
+    """Signals emitted by a PyTextLineIndexer."""
+    progress = pyqtSignal()
+    finished = pyqtSignal()
+
+
+class PyTextLineIndexer(QRunnable):
+    """Worker recording the byte offset of every line start in a mapped file."""
+    def __init__(self: QRunnable, fileMap: mmap.mmap, lineOffsets: array) -> None:
+        """Initialise the indexer.
+
+        Args:
+            fileMap (mmap.mmap): Mapped file to scan.
+            lineOffsets (array): Offsets array, starting with 0, to extend."""
+        super().__init__()
+        self.signals = PyTextIndexerSignals()
+        self._map = fileMap
+        self._lineOffsets = lineOffsets
+        self._cancelled = False
+
+
+    def run(self: QRunnable) -> None:
+        """Scan the file a chunk at a time, emitting progress after each."""
+        position = 0
+        try:
+            while not self._cancelled:
+                chunk = self._map[position:position + INDEX_CHUNK_SIZE]
+                if not chunk:
+                    break
+
+                lines = chunk.split(b"\n")
+                lineEnds = accumulate(map((1).__add__, map(len, lines[:-1])), initial=position)
+                self._lineOffsets.extend(islice(lineEnds, 1, None))
+                position += len(chunk)
+                self.signals.progress.emit()
+
+        except ValueError:
+            return
+
+        if not self._cancelled:
+            self.signals.finished.emit()
+
+
+    def cancel(self: QRunnable) -> None:
+        """Stop scanning at the next chunk."""
+        self._cancelled = True
+
+
 class PyTextCtrl:
     """PyText Controller class."""
     def __init__(self: object, model: object, view: QMainWindow) -> None:
@@ -373,38 +1522,81 @@ class PyTextCtrl:
 
     def _wordCountString(self: object) -> str:
         """Return string of current word count."""
-        return f"Word Count: {self._model.getWordCount(self._view.centralWidget.toPlainText())}"
+        return f"Word Count: {self._wordCounter.total()}"
+
+
+    def _updateWordCount(self: object, position: int, removed: int, added: int) -> None:
+        """Record an edit and schedule a refresh of the word count label."""
+        self._wordCounter.update(position, removed, added)
+        self._scheduler.schedule(self._refresh)
+
+
+    def _refreshWordCount(self: object) -> None:
+        """Show the current word count in the status bar."""
+        self._view.wcLabel.setText(self._wordCountString())
 
 
     def _connectSignals(self: object) -> None:
-        """Connect signals and slots."""
-        self._view.centralWidget.textChanged.connect(
-            lambda: self._view.wcLabel.setText(self._wordCountString())
-            )
-        self._view.newAction.triggered.connect(self._view.newFile)
-        self._view.openAction.triggered.connect(self._view.openFile)
-        self._view.saveAction.triggered.connect(self._view.saveFile)
-        self._view.exitAction.triggered.connect(self._view.closeEvent)
-        self._view.copyAction.triggered.connect(self._view.centralWidget.copy)
-        self._view.pasteAction.triggered.connect(self._view.centralWidget.paste)
-        self._view.cutAction.triggered.connect(self._view.centralWidget.cut)
-        self._view.helpAction.triggered.connect(self._view.help)
-        self._view.aboutAction.triggered.connect(self._view.about)
-        self._view.fontSizeSpinBox.valueChanged.connect(
-            lambda: self._view.centralWidget.setFontPointSize(self._fontSizeValue())
+        """Connect signals and slots.
+
+        Slots are connected through the view's profiler, which times them
+        when profiling is enabled."""
+        connect = self._view.profiler.connect
+        self._scheduler = PyTextUpdateScheduler(parent=self._view)
+        self._refresh = self._view.profiler.wrap(self._refreshWordCount)
+        self._documentSlot = self._view.profiler.wrap(self._updateWordCount)
+        self._document = None
+        self._connectDocument()
+        connect(self._view.editorChanged, self._connectDocument)
+        connect(self._view.newAction.triggered, self._view.newFile)
+        connect(self._view.openAction.triggered, self._view.openFile)
+        connect(self._view.saveAction.triggered, self._view.saveFile)
+        connect(self._view.exitAction.triggered, self._view.closeEvent)
+        connect(self._view.copyAction.triggered, lambda: self._view.centralWidget.copy(), "copy")
+        connect(self._view.pasteAction.triggered, lambda: self._view.centralWidget.paste(), "paste")
+        connect(self._view.cutAction.triggered, lambda: self._view.centralWidget.cut(), "cut")
+        connect(self._view.helpAction.triggered, self._view.help)
+        connect(self._view.aboutAction.triggered, self._view.about)
+        connect(self._view.textColourAction.triggered, self._view.fontColour)
+        connect(self._view.textHighlightAction.triggered, self._view.highlightColour)
+        connect(self._view.textFillAction.triggered, self._view.fillColour)
+        connect(self._view.textLeftAction.triggered, self._view.textLeft)
+        connect(self._view.textCentreAction.triggered, self._view.textCentre)
+        connect(self._view.textRightAction.triggered, self._view.textRight)
+        connect(self._view.textBoldAction.triggered, self._view.textBold)
+        connect(self._view.textItalicAction.triggered, self._view.textItalic)
+        connect(self._view.textUnderlineAction.triggered, self._view.textUnderline)
+        if self._view.fontComboBox is None:
+            # A lambda, unlike a bound method, keeps the controller alive.
+            self._view.deferredWidgetsCreated.connect(lambda: self._connectFontSignals())
+        else:
+            self._connectFontSignals()
+
+
+    def _connectDocument(self: object) -> None:
+        """Count the words of the current editor's document."""
+        if self._document is not None:
+            self._document.contentsChange.disconnect(self._documentSlot)
+
+        self._document = self._view.centralWidget.document()
+        self._wordCounter = PyTextWordCounter(self._document, self._model.getWordCount)
+        self._document.contentsChange.connect(self._documentSlot)
+        self._refreshWordCount()
+
+
+    def _connectFontSignals(self: object) -> None:
+        """Connect the font controls, which may be created after the window shows."""
+        connect = self._view.profiler.connect
+        connect(
+            self._view.fontSizeSpinBox.valueChanged,
+            lambda: self._view.centralWidget.setFontPointSize(self._fontSizeValue()),
+            "setFontPointSize"
         )
-        self._view.fontComboBox.currentFontChanged.connect(
-            lambda: self._view.centralWidget.setCurrentFont(self._fontAndSize())
+        connect(
+            self._view.fontComboBox.currentFontChanged,
+            lambda: self._view.centralWidget.setCurrentFont(self._fontAndSize()),
+            "setCurrentFont"
         )
-        self._view.textColourAction.triggered.connect(self._view.fontColour)
-        self._view.textHighlightAction.triggered.connect(self._view.highlightColour)
-        self._view.textFillAction.triggered.connect(self._view.fillColour)
-        self._view.textLeftAction.triggered.connect(self._view.textLeft)
-        self._view.textCentreAction.triggered.connect(self._view.textCentre)
-        self._view.textRightAction.triggered.connect(self._view.textRight)
-        self._view.textBoldAction.triggered.connect(self._view.textBold)
-        self._view.textItalicAction.triggered.connect(self._view.textItalic)
-        self._view.textUnderlineAction.triggered.connect(self._view.textUnderline)
 
 
 class PyTextModl:
@@ -429,13 +1621,846 @@ class PyTextModl:
         return QFont(font, size)
 
 
+class PyTextUpdateScheduler(QObject):
+    """Coalesces bursts of update requests into one call of each callback."""
+    def __init__(
+        self: QObject, delay: int = UPDATE_DELAY_MS,
+        maxLatency: int = UPDATE_MAX_LATENCY_MS, parent: QObject = None
+    ) -> None:
+        """Initialise the scheduler.
+
+        Args:
+            delay (int): Milliseconds without a new request before running.
+            maxLatency (int): Longest time in milliseconds a request may wait
+                while requests keep arriving.
+            parent (QObject): Parent object."""
+        super().__init__(parent)
+        self.delay = delay
+        self.maxLatency = maxLatency
+        self._pending = {}
+        self._firstRequest = QElapsedTimer()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+
+    def schedule(self: QObject, callback: Callable) -> None:
+        """Request that callback runs once the current burst of requests ends.
+
+        Args:
+            callback (Callable): Function to run. Requests for a callback that
+                is already pending are merged."""
+        if not self._pending:
+            self._firstRequest.start()
+
+        self._pending[callback] = None
+        remaining = self.maxLatency - self._firstRequest.elapsed()
+        self._timer.start(max(0, min(self.delay, remaining)))
+
+
+    def flush(self: QObject) -> None:
+        """Run every pending callback now."""
+        self._timer.stop()
+        pending, self._pending = self._pending, {}
+        for callback in pending:
+            callback()
+
+
+class PyTextWordCounter:
+    """Incremental word counter keeping a count for every block of a document."""
+    def __init__(self: object, document: QTextDocument, countWords: Callable) -> None:
+        """Initialise the counter and count the document's current contents.
+
+        Args:
+            document (QTextDocument): Document whose words are counted.
+            countWords (Callable): Function returning the word count of a string."""
+        self._document = document
+        self._countWords = countWords
+        self.reset()
+
+
+    def reset(self: object) -> None:
+        """Recount every block of the document."""
+        self._dirty = None
+        self._blockCounts = []
+        block = self._document.firstBlock()
+        while block.isValid():
+            self._blockCounts.append(self._countWords(block.text()))
+            block = block.next()
+
+        self._total = sum(self._blockCounts)
+
+
+    def update(self: object, position: int, removed: int, added: int) -> None:
+        """Record a change to the document, to be recounted by total().
+
+        Changes are merged into a single dirty range so that a burst of edits
+        costs one recount.
+
+        Args:
+            position (int): Position of the change, from contentsChange.
+            removed (int): Number of characters removed.
+            added (int): Number of characters added."""
+        end = position + added
+        if self._dirty is None:
+            self._dirty = (position, end)
+            return
+
+        start, stop = self._dirty
+        if stop >= position + removed:
+            stop += added - removed
+        elif stop > position:
+            stop = end
+
+        self._dirty = (min(start, position), max(stop, end))
+
+
+    def _recount(self: object) -> None:
+        """Recount only the blocks in the dirty range.
+
+        Blocks before the range are untouched and blocks after it only move,
+        so their counts are kept and the recount costs O(edit) rather than
+        O(document)."""
+        position, end = self._dirty
+        self._dirty = None
+        document = self._document
+        first = document.findBlock(position)
+        if not first.isValid():
+            first = document.lastBlock()
+
+        last = document.findBlock(end)
+        if not last.isValid():
+            last = document.lastBlock()
+
+        firstNumber = first.blockNumber()
+        lastNumber = last.blockNumber()
+        delta = document.blockCount() - len(self._blockCounts)
+        staleEnd = max(firstNumber, lastNumber + 1 - delta)
+        freshCounts = []
+        block = first
+        while block.isValid() and block.blockNumber() <= lastNumber:
+            freshCounts.append(self._countWords(block.text()))
+            block = block.next()
+
+        self._total -= sum(self._blockCounts[firstNumber:staleEnd])
+        self._total += sum(freshCounts)
+        self._blockCounts[firstNumber:staleEnd] = freshCounts
+
+        if len(self._blockCounts) != document.blockCount():
+            self.reset()
+
+
+    def total(self: object) -> int:
+        """Return the number of words in the document."""
+        if self._dirty is not None:
+            self._recount()
+
+        return self._total
+
+
+class PyTextRope:
+    """Immutable text stored as a balanced tree of string leaves.
+
+    Lengths and offsets are in UTF-16 code units, as QTextDocument positions
+    are. Edits return a new rope sharing all but O(log n) nodes with the old
+    one, so a rope can be handed to another thread as a snapshot while
+    editing carries on."""
+    __slots__ = ("left", "right", "text", "length", "height")
+
+    def __init__(
+        self: object, text: str = "", left: object = None, right: object = None
+    ) -> None:
+        """Create a leaf holding text, or a node joining left and right.
+
+        Use fromText to build a rope from a string of any size."""
+        self.text = text if left is None else None
+        self.left = left
+        self.right = right
+        if left is None:
+            self.length = len(text) if text.isascii() else len(text) + len(ASTRAL_REGEX.findall(text))
+            self.height = 0
+        else:
+            self.length = left.length + right.length
+            self.height = max(left.height, right.height) + 1
+
+
+    @classmethod
+    def fromText(cls: type, text: str) -> object:
+        """Return a balanced rope of ROPE_LEAF_SIZE leaves holding text."""
+        level = [cls(text[start:start + ROPE_LEAF_SIZE]) for start in range(0, len(text), ROPE_LEAF_SIZE)]
+        if not level:
+            return cls()
+
+        while len(level) > 1:
+            paired = [cls(left=level[i], right=level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                paired.append(level[-1])
+
+            level = paired
+
+        return level[0]
+
+
+    def __len__(self: object) -> int:
+        """Return the length in UTF-16 code units."""
+        return self.length
+
+
+    def __str__(self: object) -> str:
+        """Return the whole text."""
+        return "".join(self.chunks())
+
+
+    def chunks(self: object) -> Iterator:
+        """Yield the leaves' text in order."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.text is not None:
+                if node.text:
+                    yield node.text
+            else:
+                stack.append(node.right)
+                stack.append(node.left)
+
+
+    def insert(self: object, position: int, text: str) -> object:
+        """Return a rope with text inserted at position."""
+        if not text:
+            return self
+
+        left, right = self._split(position)
+        return left._join(PyTextRope.fromText(text))._join(right)
+
+
+    def delete(self: object, start: int, end: int) -> object:
+        """Return a rope without the text from start up to end."""
+        if end <= start:
+            return self
+
+        left, rest = self._split(start)
+        return left._join(rest._split(end - start)[1])
+
+
+    def slice(self: object, start: int, end: int) -> object:
+        """Return a rope of the text from start up to end."""
+        return self._split(end)[0]._split(start)[1]
+
+
+    def _split(self: object, position: int) -> tuple:
+        """Return ropes of the text before and after position."""
+        if position <= 0:
+            return PyTextRope(), self
+
+        if position >= self.length:
+            return self, PyTextRope()
+
+        if self.text is not None:
+            index = position
+            if self.length != len(self.text):
+                index = units = 0
+                while units < position:
+                    units += 2 if ord(self.text[index]) > 0xFFFF else 1
+                    index += 1
+
+            return PyTextRope(self.text[:index]), PyTextRope(self.text[index:])
+
+        leftLength = self.left.length
+        if position < leftLength:
+            left, right = self.left._split(position)
+            return left, right._join(self.right)
+
+        if position == leftLength:
+            return self.left, self.right
+
+        left, right = self.right._split(position - leftLength)
+        return self.left._join(left), right
+
+
+    def _join(self: object, other: object) -> object:
+        """Return a balanced rope of this text followed by other's.
+
+        Neighbouring leaves that fit in ROPE_LEAF_SIZE are merged, so typing
+        a character at a time does not leave a trail of tiny leaves."""
+        if not other.length:
+            return self
+
+        if not self.length:
+            return other
+
+        if (
+            self.text is not None and other.text is not None
+            and len(self.text) + len(other.text) <= ROPE_LEAF_SIZE
+        ):
+            return PyTextRope(self.text + other.text)
+
+        if self.height > other.height + 1:
+            return PyTextRope._balance(self.left, self.right._join(other))
+
+        if other.height > self.height + 1:
+            return PyTextRope._balance(self._join(other.left), other.right)
+
+        return PyTextRope(left=self, right=other)
+
+
+    @staticmethod
+    def _balance(left: object, right: object) -> object:
+        """Return a node joining left and right, rotating if one is too tall."""
+        if left.height > right.height + 1:
+            if left.left.height >= left.right.height:
+                return PyTextRope(left=left.left, right=PyTextRope(left=left.right, right=right))
+
+            middle = left.right
+            return PyTextRope(
+                left=PyTextRope(left=left.left, right=middle.left),
+                right=PyTextRope(left=middle.right, right=right)
+            )
+
+        if right.height > left.height + 1:
+            if right.right.height >= right.left.height:
+                return PyTextRope(left=PyTextRope(left=left, right=right.left), right=right.right)
+
+            middle = right.left
+            return PyTextRope(
+                left=PyTextRope(left=left, right=middle.left),
+                right=PyTextRope(left=middle.right, right=right.right)
+            )
+
+        return PyTextRope(left=left, right=right)
+
+
+class PyTextBuffer:
+    """Immutable snapshots of a QTextDocument's plain text, as PyTextRopes.
+
+    No copy of the text is kept until the first snapshot, which reads the
+    whole document. From then on changes only widen a dirty range, so
+    editing costs no read-back, and the next snapshot re-reads just that
+    range and splices it into the previous rope in O(log n)."""
+    def __init__(self: object, document: QTextDocument) -> None:
+        """Follow a document's changes, taking no snapshot yet.
+
+        Args:
+            document (QTextDocument): Document to take snapshots of."""
+        self._document = document
+        self.rope = None
+        self._dirty = None
+        self._length = 0
+        document.contentsChange.connect(self._markDirty)
+        document.contentsChanged.connect(self._verify)
+
+
+    def snapshot(self: object) -> PyTextRope:
+        """Return the document's current plain text as an immutable rope."""
+        textLength = self._document.characterCount() - 1
+        if self.rope is not None and self._dirty is not None:
+            start, ropeEnd, documentEnd = self._dirty
+            rope = self.rope.delete(start, min(ropeEnd, len(self.rope)))
+            end = min(documentEnd, textLength)
+            if end > start:
+                cursor = QTextCursor(self._document)
+                cursor.setPosition(start)
+                cursor.setPosition(end, QTextCursor.KeepAnchor)
+                rope = rope.insert(start, self._plainText(cursor.selectedText()))
+
+            self.rope = rope
+
+        if self.rope is None or len(self.rope) != textLength:
+            self.rope = PyTextRope.fromText(self._document.toPlainText())
+
+        self._dirty = None
+        self._length = textLength
+        return self.rope
+
+
+    def _markDirty(self: object, position: int, removed: int, added: int) -> None:
+        """Widen the dirty range to cover a change to the document.
+
+        The range is kept as its start, which is the same in the rope and
+        the document, and its end in each. Text after the ends matches.
+        Whole document changes report counts that include the final
+        paragraph separator, so snapshot clamps both ends."""
+        if self.rope is None:
+            return
+
+        self._length += added - removed
+        if self._dirty is None:
+            self._dirty = (position, position + removed, position + added)
+            return
+
+        start, ropeEnd, documentEnd = self._dirty
+        changedEnd = max(documentEnd, position + removed)
+        self._dirty = (
+            min(start, position),
+            ropeEnd + changedEnd - documentEnd,
+            changedEnd + added - removed
+        )
+
+
+    @staticmethod
+    def _plainText(text: str) -> str:
+        """Return selected text with separators replaced as toPlainText() does.
+
+        Chained replace calls are used over str.translate, whose per
+        character table lookups are some forty times slower on the paragraph
+        separators every line of a selection ends with."""
+        for separator, replacement in PLAIN_TEXT_REPLACEMENTS:
+            if separator in text:
+                text = text.replace(separator, replacement)
+
+        return text
+
+
+    def _verify(self: object) -> None:
+        """Drop the rope if an edit went unreported, to rebuild it in full.
+
+        QTextDocument.setPlainText and setHtml, called on the document
+        itself rather than through an editor, report clearing the old text
+        but not inserting the new."""
+        if self.rope is not None and self._length != self._document.characterCount() - 1:
+            self.rope = None
+            self._dirty = None
+
+
+class PyTextFontCache:
+    """List of installed font families kept on disk between runs.
+
+    Enumerating fonts through QFontDatabase is slow on systems with many
+    fonts, so the list is saved as JSON alongside a stamp of the fontconfig
+    cache directories' modification times. While the stamp matches, the
+    saved list is used as is; installing or removing fonts updates those
+    caches and so invalidates it."""
+    def __init__(self: object, path: str = FONT_CACHE_PATH) -> None:
+        """Initialise the cache.
+
+        Args:
+            path (str): JSON file to keep the list in. An empty string
+                disables the cache."""
+        self.path = path
+
+
+    def families(self: object) -> list:
+        """Return the installed font families, from the cache if it is current."""
+        stamp = self._stamp()
+        if self.path:
+            try:
+                with open(self.path) as file:
+                    cached = json.load(file)
+                if cached.get("stamp") == stamp:
+                    return cached["families"]
+
+            except (OSError, ValueError, KeyError, AttributeError):
+                pass
+
+        families = QFontDatabase().families()
+        if self.path:
+            temporary = f"{self.path}.{uuid4().hex}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(temporary, "w") as file:
+                    json.dump({"stamp": stamp, "families": families}, file)
+                os.replace(temporary, self.path)
+            except OSError:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+
+        return families
+
+
+    def _stamp(self: object) -> list:
+        """Return the modification times of the font caches and directories.
+
+        Where there is no fontconfig, as on Windows and macOS, the system
+        font directories are used instead."""
+        directories = [path for path in FONTCONFIG_CACHE_DIRS if os.path.isdir(path)]
+        if not directories:
+            directories = QStandardPaths.standardLocations(QStandardPaths.FontsLocation)
+
+        stamp = [["Qt", QT_VERSION_STR]]
+        for directory in directories:
+            try:
+                stamp.append([directory, os.stat(directory).st_mtime_ns])
+            except OSError:
+                continue
+
+        return stamp
+
+
+class PyTextFontModel(QAbstractListModel):
+    """Font families exposed a batch at a time, each previewed in its font.
+
+    Rows are handed to views through fetchMore as they are scrolled to, and
+    the preview font for a row is only created when a view asks to draw it."""
+    def __init__(self: QAbstractListModel, families: list, parent: QObject = None) -> None:
+        """Initialise the model.
+
+        Args:
+            families (list): Every font family name, in display order.
+            parent (QObject): Parent object."""
+        super().__init__(parent)
+        self.families = families
+        self._rows = {family: row for row, family in enumerate(families)}
+        self._fetched = 0
+
+
+    def rowCount(self: QAbstractListModel, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of rows fetched so far."""
+        return 0 if parent.isValid() else self._fetched
+
+
+    def data(self: QAbstractListModel, index: QModelIndex, role: int = Qt.DisplayRole) -> object:
+        """Return a family's name, or its font for previews."""
+        if not index.isValid() or index.row() >= self._fetched:
+            return None
+
+        family = self.families[index.row()]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return family
+
+        if role == Qt.FontRole:
+            return QFont(family)
+
+        return None
+
+
+    def canFetchMore(self: QAbstractListModel, parent: QModelIndex) -> bool:
+        """Return True while some families have not been handed to views."""
+        return not parent.isValid() and self._fetched < len(self.families)
+
+
+    def fetchMore(self: QAbstractListModel, parent: QModelIndex) -> None:
+        """Hand the next FONT_FETCH_SIZE families to views."""
+        self.fetchTo(self._fetched + FONT_FETCH_SIZE - 1)
+
+
+    def fetchTo(self: QAbstractListModel, row: int) -> None:
+        """Make sure rows up to and including row have been fetched."""
+        last = min(row, len(self.families) - 1)
+        if last < self._fetched:
+            return
+
+        self.beginInsertRows(QModelIndex(), self._fetched, last)
+        self._fetched = last + 1
+        self.endInsertRows()
+
+
+    def rowOf(self: QAbstractListModel, family: str) -> int:
+        """Return the row of a family, fetching it if needed, or -1."""
+        row = self._rows.get(family, -1)
+        if row >= 0:
+            self.fetchTo(row)
+
+        return row
+
+
+class PyTextFontComboBox(QComboBox):
+    """Font picker listing cached font families and previewing visible rows.
+
+    A drop-in for the parts of QFontComboBox PyText uses: currentFont,
+    setCurrentFont, currentText and the currentFontChanged signal. Family
+    names can be typed, completing against every family."""
+    currentFontChanged = pyqtSignal(QFont)
+
+    def __init__(self: QComboBox, parent: QObject = None, cache: PyTextFontCache = None) -> None:
+        """Initialise the combo box from the font cache.
+
+        Args:
+            parent (QWidget): Parent widget.
+            cache (PyTextFontCache): Source of the font family list."""
+        super().__init__(parent)
+        families = (cache or PyTextFontCache()).families()
+        self.setModel(PyTextFontModel(families, self))
+        self.setEditable(True)
+        self.setInsertPolicy(QComboBox.NoInsert)
+        self.setMaxVisibleItems(16)
+        self.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
+        self.setMinimumContentsLength(16)
+        completer = QCompleter(QStringListModel(families, self), self)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.setCompleter(completer)
+        self.lineEdit().editingFinished.connect(self._selectTyped)
+        self.currentIndexChanged.connect(self._indexChanged)
+
+
+    def currentFont(self: QComboBox) -> QFont:
+        """Return the selected font."""
+        return QFont(self.currentText())
+
+
+    def setCurrentFont(self: QComboBox, font: QFont) -> None:
+        """Select a font's family, resolving aliases such as "Courier"."""
+        model = self.model()
+        row = model.rowOf(font.family())
+        if row < 0:
+            row = model.rowOf(QFontInfo(font).family())
+
+        if row >= 0:
+            self.setCurrentIndex(row)
+
+
+    def _selectTyped(self: QComboBox) -> None:
+        """Select the family typed into the line edit, if there is one."""
+        text = self.lineEdit().text()
+        family = next(
+            (family for family in self.model().families if family.lower() == text.lower()),
+            None
+        )
+        if family is None:
+            self.lineEdit().setText(self.itemText(self.currentIndex()))
+        else:
+            self.setCurrentFont(QFont(family))
+
+
+    def _indexChanged(self: QComboBox, index: int) -> None:
+        """Emit currentFontChanged for the newly selected family."""
+        if index >= 0:
+            self.currentFontChanged.emit(self.currentFont())
+
+
+class PyTextProfiler:
+    """Opt-in instrumentation writing a Chrome trace of where time goes.
+
+    Connected slots are recorded as complete events, open and save as
+    asynchronous phases, and a timer on the GUI thread records a stall
+    whenever the event loop comes back to it later than the threshold. Load
+    the report in chrome://tracing or https://ui.perfetto.dev. A profiler
+    without a path records nothing and hands slots back unwrapped."""
+    def __init__(
+        self: object, path: str = None, stallThreshold: int = STALL_THRESHOLD_MS
+    ) -> None:
+        """Initialise the profiler.
+
+        Args:
+            path (str): File to write the trace to. Profiling is disabled
+                when this is empty.
+            stallThreshold (int): Milliseconds the event loop may be late
+                before a stall is recorded."""
+        self.path = path
+        self.enabled = bool(path)
+        self.stallThreshold = stallThreshold
+        self.events = []
+        self._spanIds = iter(range(1, sys.maxsize))
+        self._pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._stallTimer = None
+
+
+    def connect(self: object, signal: object, slot: Callable, name: str = None) -> None:
+        """Connect signal to slot, timing the slot when profiling.
+
+        Args:
+            signal (object): Bound Qt signal.
+            slot (Callable): Slot to connect.
+            name (str): Name to record the slot under. Defaults to the
+                slot's qualified name."""
+        signal.connect(self.wrap(slot, name))
+
+
+    def wrap(self: object, slot: Callable, name: str = None) -> Callable:
+        """Return slot, wrapped to record each call when profiling.
+
+        The wrapper passes on only as many signal arguments as the slot
+        accepts, as PyQt does for slots connected directly. Slots whose
+        signature cannot be inspected are called without arguments."""
+        if not self.enabled:
+            return slot
+
+        name = name or getattr(slot, "__qualname__", None) or repr(slot)
+        arity = self._arity(slot)
+
+        def timed(*args: object) -> object:
+            start = time.perf_counter()
+            try:
+                return slot(*args[:arity])
+            finally:
+                self._record(name, start, time.perf_counter(), "slot")
+
+        return timed
+
+
+    @contextmanager
+    def span(self: object, name: str, **args: object) -> object:
+        """Context manager recording the time spent in its block."""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, start, time.perf_counter(), "phase", args)
+
+
+    def begin(self: object, name: str, **args: object) -> object:
+        """Start a phase that ends in another slot, returning its handle."""
+        if not self.enabled:
+            return None
+
+        span = (name, next(self._spanIds))
+        self._addEvent({
+            "name": name, "cat": "phase", "ph": "b", "id": span[1],
+            "ts": self._timestamp(time.perf_counter()), "args": args,
+        })
+        return span
+
+
+    def end(self: object, span: object) -> None:
+        """End a phase started with begin. None is ignored."""
+        if span is None:
+            return
+
+        self._addEvent({
+            "name": span[0], "cat": "phase", "ph": "e", "id": span[1],
+            "ts": self._timestamp(time.perf_counter()),
+        })
+
+
+    def start(self: object, parent: QObject = None) -> None:
+        """Start watching the event loop for stalls."""
+        if not self.enabled or self._stallTimer is not None:
+            return
+
+        self._stallTimer = QTimer(parent)
+        self._stallTimer.setTimerType(Qt.PreciseTimer)
+        self._stallTimer.timeout.connect(self._checkStall)
+        self._lastCheck = time.perf_counter()
+        self._stallTimer.start(STALL_CHECK_MS)
+
+
+    def write(self: object) -> None:
+        """Write the trace to path and print the slowest slots to stderr."""
+        if not self.enabled:
+            return
+
+        with open(self.path, "w") as file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+        totals = {}
+        for event in self.events:
+            if event.get("cat") == "slot":
+                count, total = totals.get(event["name"], (0, 0))
+                totals[event["name"]] = (count + 1, total + event["dur"])
+
+        print(f"PyText profile written to {self.path}", file=sys.stderr)
+        for name, (count, total) in sorted(totals.items(), key=lambda item: -item[1][1])[:10]:
+            print(f"{total / 1000:10.1f} ms {count:8d} calls  {name}", file=sys.stderr)
+
+
+    def _checkStall(self: object) -> None:
+        """Record a stall if the timer fired later than the threshold."""
+        now = time.perf_counter()
+        late = (now - self._lastCheck) * 1000 - STALL_CHECK_MS
+        if late > self.stallThreshold:
+            self._record("stall", now - late / 1000, now, "stall")
+
+        self._lastCheck = now
+
+
+    def _record(
+        self: object, name: str, start: float, end: float, category: str,
+        args: dict = None
+    ) -> None:
+        """Record a complete event on the calling thread."""
+        event = {
+            "name": name, "cat": category, "ph": "X",
+            "ts": self._timestamp(start), "dur": (end - start) * 1000000,
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+
+        self._addEvent(event)
+
+
+    def _addEvent(self: object, event: dict) -> None:
+        """Add an event to the trace, up to MAX_TRACE_EVENTS."""
+        if len(self.events) < MAX_TRACE_EVENTS:
+            event["pid"] = self._pid
+            event.setdefault("tid", threading.get_ident())
+            self.events.append(event)
+
+
+    def _timestamp(self: object, seconds: float) -> float:
+        """Return a perf_counter time as microseconds since the profiler started."""
+        return (seconds - self._origin) * 1000000
+
+
+    def _arity(self: object, slot: Callable) -> int:
+        """Return how many positional arguments slot accepts."""
+        try:
+            parameters = inspect.signature(slot).parameters.values()
+        except (TypeError, ValueError):
+            return 0
+
+        arity = 0
+        for parameter in parameters:
+            if parameter.kind == parameter.VAR_POSITIONAL:
+                return sys.maxsize
+
+            if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD):
+                arity += 1
+
+        return arity
+
+
+def splitCompression(path: str) -> tuple:
+    """Split a compression suffix listed in COMPRESSORS off a path.
+
+    Args:
+        path (str): Path of a file.
+
+    Returns:
+        tuple: The path without the suffix and a callable opening a file
+            object with it in a given mode, or the path and None."""
+    stem, extension = os.path.splitext(path)
+    compressor = COMPRESSORS.get(extension.lower())
+    return (stem, compressor) if compressor else (path, None)
+
+
+def parseArgs(argv: list) -> tuple:
+    """Return PyText's command line options and the arguments left for Qt."""
+    parser = argparse.ArgumentParser(prog="pytext", description="PyText editor")
+    parser.add_argument(
+        "--profile", metavar="FILE", default=PROFILE_PATH,
+        help="time slots, file phases and event loop stalls, writing a "
+        "Chrome trace to FILE on exit (default: $PYTEXT_PROFILE)"
+    )
+    parser.add_argument(
+        "--profile-stall", metavar="MS", type=int, default=STALL_THRESHOLD_MS,
+        help="milliseconds the event loop may be blocked before a stall is recorded"
+    )
+    parser.add_argument(
+        "--fast-start", action="store_true",
+        help="show the editor first and build menus and toolbars once it has painted"
+    )
+    parser.add_argument(
+        "--watchdog", metavar="MS", type=int, default=0,
+        help="log the GUI thread's stack when the event loop is blocked for MS milliseconds"
+    )
+    parser.add_argument(
+        "--watchdog-log", metavar="FILE",
+        help="file to append watchdog reports to (default: stderr)"
+    )
+    return parser.parse_known_args(argv)
+
+
 def main():
-    app = QApplication(sys.argv)
-    view = PyTextGui()
+    args, qtArgs = parseArgs(sys.argv[1:])
+    app = QApplication(sys.argv[:1] + qtArgs)
+    profiler = PyTextProfiler(args.profile, args.profile_stall)
+    view = PyTextGui(profiler=profiler, fastStart=args.fast_start)
     view.show()
     model = PyTextModl()
     PyTextCtrl(model=model, view=view)
-    sys.exit(app.exec_())
+    profiler.start(view)
+    watchdog = PyWatchdog(args.watchdog, args.watchdog_log, app)
+    if args.watchdog:
+        watchdog.start()
+
+    status = app.exec_()
+    watchdog.stop()
+    profiler.write()
+    sys.exit(status)
 
 
 if __name__ == '__main__':
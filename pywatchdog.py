@@ -0,0 +1,108 @@
+import sys
+import threading
+import time
+import traceback
+
+from PyQt5.QtCore import QObject
+from PyQt5.QtCore import Qt
+from PyQt5.QtCore import QTimer
+
+
+WATCHDOG_THRESHOLD_MS = 500
+HEARTBEATS_PER_THRESHOLD = 4
+
+
+class PyWatchdog(QObject):
+    """Watchdog logging the GUI thread's stack when its event loop stalls.
+
+    A timer on the GUI thread records a heartbeat several times per
+    threshold. A daemon thread checks the heartbeat and, when none has
+    arrived for longer than the threshold, logs the stack the GUI thread is
+    stuck in. Once the event loop runs again the length of the stall is
+    logged too."""
+    def __init__(
+        self: QObject, threshold: int = WATCHDOG_THRESHOLD_MS, log: object = None,
+        parent: QObject = None
+    ) -> None:
+        """Initialise the watchdog; call start to begin watching.
+
+        Args:
+            threshold (int): Milliseconds without a heartbeat that count as a
+                stall.
+            log (object): Path of a file to append reports to, or a text
+                stream. Defaults to stderr.
+            parent (QObject): Parent object."""
+        super().__init__(parent)
+        self.threshold = threshold
+        self._log = log or sys.stderr
+        self._logLock = threading.Lock()
+        self._stopped = threading.Event()
+        self._stallStart = None
+        self._lastBeat = time.monotonic()
+        self._threadId = None
+        self._thread = None
+        self._heartbeat = QTimer(self)
+        self._heartbeat.setTimerType(Qt.PreciseTimer)
+        self._heartbeat.timeout.connect(self._beat)
+
+
+    def start(self: QObject) -> None:
+        """Start watching the thread this is called from."""
+        if self._thread is not None:
+            return
+
+        self._threadId = threading.get_ident()
+        self._lastBeat = time.monotonic()
+        self._heartbeat.start(max(1, self.threshold // HEARTBEATS_PER_THRESHOLD))
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name="PyWatchdog", daemon=True)
+        self._thread.start()
+
+
+    def stop(self: QObject) -> None:
+        """Stop watching."""
+        self._heartbeat.stop()
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+    def _beat(self: QObject) -> None:
+        """Record that the event loop is running, ending any stall."""
+        now = time.monotonic()
+        self._lastBeat = now
+        if self._stallStart is not None:
+            duration = (now - self._stallStart) * 1000
+            self._stallStart = None
+            self._write(f"Event loop recovered after a {duration:.0f} ms stall\n")
+
+
+    def _watch(self: QObject) -> None:
+        """Check the heartbeat until stopped, reporting each stall once."""
+        interval = self.threshold / 1000 / HEARTBEATS_PER_THRESHOLD
+        while not self._stopped.wait(interval):
+            lastBeat = self._lastBeat
+            if self._stallStart is None and time.monotonic() - lastBeat > self.threshold / 1000:
+                frame = sys._current_frames().get(self._threadId)
+                if frame is None:
+                    continue
+
+                self._stallStart = lastBeat
+                stack = "".join(traceback.format_stack(frame))
+                del frame
+                self._write(
+                    f"Event loop stalled for over {self.threshold} ms at "
+                    f"{time.strftime('%Y-%m-%d %H:%M:%S')}, GUI thread stack:\n{stack}"
+                )
+
+
+    def _write(self: QObject, message: str) -> None:
+        """Append a report to the log."""
+        with self._logLock:
+            if isinstance(self._log, str):
+                with open(self._log, "a") as file:
+                    file.write(message)
+            else:
+                self._log.write(message)
+                self._log.flush()
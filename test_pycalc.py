@@ -0,0 +1,71 @@
+import random
+import re
+import unittest
+import warnings
+
+from pycalc import compileExpression
+from pycalc import ERROR_MSG
+from pycalc import evaluateExpression
+from pycalc import formatResult
+from pycalc import TOO_EXPENSIVE_MSG
+
+
+KEYPAD_TOKENS = list("0123456789+-*/()") + ["00", "."]
+FUZZ_EXPRESSIONS = 60000
+MAX_FUZZ_TOKENS = 12
+LEADING_ZERO_REGEX = re.compile(r'(?<![\d.])0\d')
+
+
+def referenceResult(expression: str) -> str:
+    """Return what eval makes of an expression, as PyCalc displays it."""
+    try:
+        with warnings.catch_warnings():
+            # Input such as 2(3) compiles with a "not callable" warning.
+            warnings.simplefilter("ignore", SyntaxWarning)
+            return formatResult(eval(expression, {"__builtins__": {}}))
+
+    except Exception:
+        return ERROR_MSG
+
+
+class PyCalcEvalTest(unittest.TestCase):
+    """evaluateExpression against eval on expressions typed on the keypad."""
+    def testMatchesEval(self: unittest.TestCase) -> None:
+        """Random keypad input gives the same result or error as eval.
+
+        Integers with leading zeros and empty parentheses are skipped: PyCalc
+        reads 007 as 7 where eval refuses it, and () is an error rather than
+        an empty tuple. Results too expensive for PyCalc are skipped too, as
+        eval would spend as long computing them."""
+        generator = random.Random(9)
+        compared = 0
+        for _ in range(FUZZ_EXPRESSIONS):
+            tokens = generator.choices(KEYPAD_TOKENS, k=generator.randint(1, MAX_FUZZ_TOKENS))
+            expression = "".join(tokens)
+            if LEADING_ZERO_REGEX.search(expression) or "()" in expression:
+                continue
+
+            result = evaluateExpression(expression)
+            if result == TOO_EXPENSIVE_MSG:
+                continue
+
+            self.assertEqual(result, referenceResult(expression), expression)
+            compared += 1
+
+        self.assertGreater(compared, FUZZ_EXPRESSIONS // 2)
+
+    def testLeadingZeros(self: unittest.TestCase) -> None:
+        """Integers typed with leading zeros are read as decimal."""
+        self.assertEqual(evaluateExpression("007+00"), "7")
+
+    def testEmptyParentheses(self: unittest.TestCase) -> None:
+        """Empty parentheses are an error."""
+        self.assertEqual(evaluateExpression("()"), ERROR_MSG)
+
+    def testCompileCache(self: unittest.TestCase) -> None:
+        """Compiling an expression again reuses the cached program."""
+        self.assertIs(compileExpression("1+2*3"), compileExpression("1+2*3"))
+
+
+if __name__ == "__main__":
+    unittest.main()
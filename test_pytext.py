@@ -0,0 +1,161 @@
+import os
+import random
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtGui import QTextDocument
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtWidgets import QPlainTextEdit
+from PyQt5.QtWidgets import QTextEdit
+
+from pytext import PyTextBuffer
+from pytext import PyTextModl
+from pytext import PyTextRope
+from pytext import PyTextWordCounter
+
+
+EDIT_ALPHABET = "ab c\né\U0001F600\t"
+RANDOM_EDITS = 3000
+CHECK_PROBABILITY = 0.15
+
+
+def application() -> QApplication:
+    """Return the QApplication, creating it on first use."""
+    return QApplication.instance() or QApplication([])
+
+
+def randomText(generator: random.Random, length: int) -> str:
+    """Return length characters drawn from EDIT_ALPHABET."""
+    return "".join(generator.choice(EDIT_ALPHABET) for _ in range(length))
+
+
+def insideSurrogatePair(document: QTextDocument, position: int) -> bool:
+    """Return True if position falls between the halves of a surrogate pair.
+
+    A QTextCursor never stops there, so the random edits avoid it too."""
+    return 0 < position < document.characterCount() - 1 and \
+        "\udc00" <= document.characterAt(position) <= "\udfff"
+
+
+def randomEdit(generator: random.Random, document: QTextDocument) -> None:
+    """Insert or remove a little text at a random place, as typing would.
+
+    Now and then the whole document is replaced with setPlainText, which a
+    bare QTextDocument reports only in part."""
+    length = document.characterCount() - 1
+    cursor = QTextCursor(document)
+    choice = generator.random()
+    if choice < 0.02:
+        document.setPlainText(randomText(generator, generator.randint(0, 50)))
+    elif choice < 0.5:
+        position = generator.randint(0, length)
+        if not insideSurrogatePair(document, position):
+            cursor.setPosition(position)
+            cursor.insertText(randomText(generator, generator.randint(1, 8)))
+    else:
+        start = generator.randint(0, length)
+        end = generator.randint(start, min(length, start + 10))
+        if not insideSurrogatePair(document, start) and not insideSurrogatePair(document, end):
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+
+
+class PyTextRopeTest(unittest.TestCase):
+    """PyTextRope edits against the same edits on a string."""
+    def testEditsMatchString(self: unittest.TestCase) -> None:
+        """Random inserts, deletes and slices give the same text as str."""
+        generator = random.Random(3)
+        text = "x" * 10000
+        rope = PyTextRope.fromText(text)
+        for _ in range(2000):
+            start = generator.randint(0, len(text))
+            if generator.random() < 0.5:
+                added = "".join(generator.choice("ab\n") for _ in range(generator.randint(1, 20)))
+                text = text[:start] + added + text[start:]
+                rope = rope.insert(start, added)
+            else:
+                end = generator.randint(start, min(len(text), start + 50))
+                text = text[:start] + text[end:]
+                rope = rope.delete(start, end)
+
+            self.assertEqual(len(rope), len(text))
+
+        self.assertEqual(str(rope), text)
+        self.assertEqual(str(rope.slice(100, 5000)), text[100:5000])
+
+
+class PyTextBufferTest(unittest.TestCase):
+    """PyTextBuffer snapshots against toPlainText() under random edits."""
+    def setUp(self: unittest.TestCase) -> None:
+        """Create the application the editors need."""
+        self.app = application()
+
+
+    def checkSnapshots(self: unittest.TestCase, document: QTextDocument, seed: int) -> None:
+        """Edit document at random, comparing snapshots along the way."""
+        generator = random.Random(seed)
+        buffer = PyTextBuffer(document)
+        for number in range(RANDOM_EDITS):
+            randomEdit(generator, document)
+            if generator.random() < CHECK_PROBABILITY:
+                self.assertEqual(str(buffer.snapshot()), document.toPlainText(), number)
+
+        self.assertEqual(str(buffer.snapshot()), document.toPlainText())
+
+
+    def testBareDocument(self: unittest.TestCase) -> None:
+        """Snapshots follow a QTextDocument used without an editor."""
+        self.checkSnapshots(QTextDocument(), 1)
+
+
+    def testPlainEditor(self: unittest.TestCase) -> None:
+        """Snapshots follow the plain text editor's document."""
+        editor = QPlainTextEdit()
+        self.checkSnapshots(editor.document(), 2)
+
+
+    def testRichEditor(self: unittest.TestCase) -> None:
+        """Snapshots follow the rich text editor's document."""
+        editor = QTextEdit()
+        self.checkSnapshots(editor.document(), 3)
+
+
+    def testSnapshotIsImmutable(self: unittest.TestCase) -> None:
+        """A snapshot keeps its text when the document changes later."""
+        document = QTextDocument()
+        buffer = PyTextBuffer(document)
+        QTextCursor(document).insertText("first")
+        snapshot = buffer.snapshot()
+        QTextCursor(document).insertText("second ")
+        self.assertEqual(str(snapshot), "first")
+        self.assertEqual(str(buffer.snapshot()), "second first")
+
+
+class PyTextWordCounterTest(unittest.TestCase):
+    """PyTextWordCounter totals against counting the whole text."""
+    def setUp(self: unittest.TestCase) -> None:
+        """Create the application the editors need."""
+        self.app = application()
+
+
+    def testRandomEdits(self: unittest.TestCase) -> None:
+        """The total matches a full count after any run of random edits."""
+        countWords = PyTextModl().getWordCount
+        generator = random.Random(4)
+        editor = QTextEdit()
+        document = editor.document()
+        counter = PyTextWordCounter(document, countWords)
+        document.contentsChange.connect(counter.update)
+        for number in range(RANDOM_EDITS):
+            randomEdit(generator, document)
+            if generator.random() < CHECK_PROBABILITY:
+                self.assertEqual(counter.total(), countWords(document.toPlainText()), number)
+
+        self.assertEqual(counter.total(), countWords(document.toPlainText()))
+
+
+if __name__ == "__main__":
+    unittest.main()